@@ -0,0 +1,85 @@
+# src/benchmarks/import_time.py
+import argparse
+import json
+import subprocess
+import sys
+
+# Modules only the charts role may load.
+HEAVY_MODULES = ('dash', 'plotly', 'pandas')
+
+ROLE_SETS = ('vtn', 'ven', 'vtn,ven', 'charts', 'vtn,ven,charts')
+
+# Runs in a fresh interpreter, so nothing is cached from a previous measurement.
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+from src.openleadr_node.__main__ import import_role
+for role in {roles!r}.split(','):
+  import_role(role)
+print(json.dumps({{
+  'seconds': time.perf_counter() - start,
+  'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+  'heavy': sorted(m for m in {heavy!r} if m in sys.modules),
+}}))
+"""
+
+
+def measure(roles: str, repeat: int) -> dict:
+  """
+  Measures the import time and memory of the modules needed for a role set.
+
+  Parameters
+  ----------
+  roles : str
+      Comma separated roles, as passed to `--roles`.
+  repeat : int
+      The number of fresh interpreters to start, the fastest run is kept.
+
+  Returns
+  -------
+  dict
+      The fastest run with 'seconds', 'max_rss_mb' and 'heavy' keys.
+  """
+  runs = []
+  for _ in range(repeat):
+    output = subprocess.run(
+      [sys.executable, '-c', PROBE.format(roles=roles, heavy=HEAVY_MODULES)],
+      check=True,
+      capture_output=True,
+      text=True,
+    ).stdout
+    runs.append(json.loads(output.splitlines()[-1]))
+  return min(runs, key=lambda run: run['seconds'])
+
+
+def main():
+  """
+  Benchmarks node startup imports per role set.
+
+  Exits with status 1 if a role set without 'charts' loads one of the chart
+  dependencies, or if a role set exceeds `--max-seconds`.
+  """
+  parser = argparse.ArgumentParser(description='Benchmark node import time per role.')
+  parser.add_argument('--repeat', type=int, default=5)
+  parser.add_argument('--max-seconds', type=float, default=None)
+  args = parser.parse_args()
+
+  failures = []
+  for roles in ROLE_SETS:
+    result = measure(roles, args.repeat)
+    print(
+      f'{roles:<16} {result["seconds"] * 1000:8.1f} ms'
+      f' {result["max_rss_mb"]:8.1f} MB  heavy: {", ".join(result["heavy"]) or "-"}'
+    )
+    if 'charts' not in roles and result['heavy']:
+      failures.append(f'{roles} imports {", ".join(result["heavy"])}')
+    if args.max_seconds is not None and result['seconds'] > args.max_seconds:
+      failures.append(f'{roles} took {result["seconds"]:.3f}s')
+
+  for failure in failures:
+    print(f'FAIL: {failure}', file=sys.stderr)
+  sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,75 @@
+# src/benchmarks/scheduler.py
+import argparse
+import random
+import time
+from datetime import UTC, datetime, timedelta
+
+from src.server.event_scheduler import EventScheduler
+from src.server.report_stats import ReportStatistics
+
+
+class _CountingServer:
+  """Stands in for OpenADRServer and only counts the events it receives."""
+
+  def __init__(self):
+    self.events = 0
+
+  def add_event(self, **kwargs):
+    self.events += 1
+
+
+def run(vens: int, seed: int = 0) -> dict:
+  """
+  Schedules and dispatches one fleet-wide shed target across `vens` VENs.
+
+  Returns
+  -------
+  dict
+      The seconds spent per phase and the number of events issued.
+  """
+  rng = random.Random(seed)
+  now = datetime.now(tz=UTC)
+  report_stats = ReportStatistics()
+  server = _CountingServer()
+  scheduler = EventScheduler(server, report_stats)
+
+  for index in range(vens):
+    ven_id = f'ven{index}'
+    stream_id = report_stats.stream_id(ven_id, 'device001', 'RealPower')
+    report_stats.update(stream_id, now, rng.uniform(1.0, 10.0))
+    scheduler.add_to_group('fleet', ven_id)
+
+  start = now + timedelta(minutes=10)
+  began = time.perf_counter()
+  scheduler.schedule_shed(vens * 2.0, start, start + timedelta(hours=1), group='fleet')
+  scheduled = time.perf_counter()
+  scheduler.dispatch_due(now=start)
+  dispatched = time.perf_counter()
+
+  return {
+    'schedule': scheduled - began,
+    'dispatch': dispatched - scheduled,
+    'events': server.events,
+  }
+
+
+def main():
+  """
+  Benchmarks fleet-level scheduling, by default for 10k VENs.
+
+  Also runs twice the fleet size to show that the cost grows linearly.
+  """
+  parser = argparse.ArgumentParser(description='Benchmark the event scheduler.')
+  parser.add_argument('--vens', type=int, default=10_000)
+  args = parser.parse_args()
+
+  for vens in (args.vens, args.vens * 2):
+    result = run(vens)
+    print(
+      f'{vens:>7} VENs  schedule {result["schedule"] * 1000:8.1f} ms'
+      f'  dispatch {result["dispatch"] * 1000:8.1f} ms  events {result["events"]}'
+    )
+
+
+if __name__ == '__main__':
+  main()
@@ -2,6 +2,10 @@
 
 __version__ = '1.0.0'
 
-from .openleadr_client import OpenLeADRClient
+from ..util.lazy_exports import lazy_exports
 
 __all__ = ['OpenLeADRClient']
+
+# Exported names are resolved on first access, so importing the package does not
+# pull in openleadr until the client is actually used.
+__getattr__ = lazy_exports(globals(), {'OpenLeADRClient': '.openleadr_client'})
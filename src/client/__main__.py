@@ -18,7 +18,7 @@ def main():
 
   try:
     loop = asyncio.new_event_loop()
-    loop.create_task(open_leadr_client.client.run())
+    loop.create_task(open_leadr_client.run())
     loop.run_forever()
   except KeyboardInterrupt:
     logger.info('Client interrupted by user.')
@@ -1,9 +1,12 @@
+import asyncio
+import logging
+import random
 import string
 from datetime import timedelta
-import logging
 
 from openleadr import OpenADRClient, enable_default_logging
 
+from src.diagnostics import Diagnostics
 from src.openleadr_node.dependencies.venInterface import VenDependencyInterface
 
 enable_default_logging()
@@ -12,9 +15,29 @@ logger = logging.getLogger(__name__)
 
 class OpenLeADRClient:
   def __init__(
-    self, ven_name: string, vtn_url: string, controller: VenDependencyInterface
+    self,
+    ven_name: string,
+    vtn_url: string,
+    controller: VenDependencyInterface,
+    diagnostics: Diagnostics = None,
+    retry_delay: float = 1.0,
+    max_retry_delay: float = 60.0,
   ):
     self.client = OpenADRClient(ven_name=ven_name, vtn_url=vtn_url)
+    self.ven_name = ven_name
+    self.retry_delay = retry_delay
+    self.max_retry_delay = max_retry_delay
+    self.diagnostics = diagnostics
+    if diagnostics is not None:
+      # Record the timings of the handlers in the diagnostics of the node.
+      self.collect_report_value = diagnostics.wrap(
+        'ven.collect_report_value', self.collect_report_value
+      )
+      self.handle_event = diagnostics.wrap(
+        'ven.handle_event',
+        self.handle_event,
+        lambda event: {'event_id': event['event_descriptor'].get('event_id')},
+      )
 
     self.client.add_report(
       callback=self.collect_report_value,
@@ -27,6 +50,42 @@ class OpenLeADRClient:
     self.client.add_handler('on_event', self.handle_event)
     self.controller = controller
 
+  async def run(self, max_attempts: int | None = None):
+    """
+    Runs the client, retrying the registration until the VTN accepts it.
+
+    openleadr gives up for good when its registration is rejected, e.g. with a
+    503 while the VTN sheds a registration storm. Retries back off exponentially
+    up to `max_retry_delay`, with full jitter so that rejected VENs do not come
+    back all at once.
+
+    Parameters
+    ----------
+    max_attempts : int, optional
+        The number of registration attempts before giving up, unlimited if None.
+    """
+    delay = self.retry_delay
+    attempt = 1
+    while True:
+      await self.client.run()
+      if self.client.registration_id:
+        return
+      if max_attempts is not None and attempt >= max_attempts:
+        logger.error(
+          f'VEN {self.ven_name} gave up registering after {attempt} attempts.'
+        )
+        return
+
+      # openleadr closed its HTTP session when the registration failed.
+      self.client.client_session = None
+      wait = random.uniform(0, delay)
+      logger.warning(
+        f'Registration of VEN {self.ven_name} failed, retrying in {wait:.1f}s.'
+      )
+      await asyncio.sleep(wait)
+      delay = min(delay * 2, self.max_retry_delay)
+      attempt += 1
+
   async def collect_report_value(self):
     # This callback is called when you need to collect a value for your Report
     value = self.controller.handle_collect_report_value()
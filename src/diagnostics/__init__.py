@@ -0,0 +1,17 @@
+# __init__.py
+
+__version__ = '1.0.0'
+
+from .diagnostics import Diagnostics, create_diagnostics
+from .handler_timings import HandlerTimings
+from .loop_watchdog import LoopWatchdog
+from .profiler import PROFILER_ENGINES, Profiler
+
+__all__ = [
+  'PROFILER_ENGINES',
+  'Diagnostics',
+  'HandlerTimings',
+  'LoopWatchdog',
+  'Profiler',
+  'create_diagnostics',
+]
@@ -0,0 +1,197 @@
+import asyncio
+import json
+import logging
+import signal
+import time
+
+from aiohttp import web
+
+from .handler_timings import HandlerTimings
+from .loop_watchdog import LoopWatchdog
+from .profiler import Profiler
+
+logger = logging.getLogger(__name__)
+
+
+class Diagnostics:
+  """
+  The diagnostics surface of a node: handler timings, event-loop stalls and
+  on-demand profiles.
+
+  A process should share one instance between its VTN and VEN, so that the
+  report covers both and the signal handlers are installed once.
+
+  The diagnostics are triggered by
+    GET /diagnostics                  Returns the report as JSON, see `report`.
+    POST /diagnostics/profile         Captures a profile and returns its path and
+                                      summary, takes `seconds` and `engine`.
+    SIGUSR1                           Captures a profile of `profile_seconds` and
+                                      logs its summary.
+    SIGUSR2                           Logs the report.
+
+  The HTTP routes have no access control of their own. They belong on a site
+  bound to the loopback interface, never on the OpenADR port of the node.
+
+  Attributes
+  ----------
+  timings : HandlerTimings
+      The timings of the wrapped handlers.
+  watchdog : LoopWatchdog
+      Records the stacks of callbacks that block the event loop.
+  profiler : Profiler
+      Captures on-demand profiles.
+  profile_seconds : float
+      The length of a profile triggered by SIGUSR1.
+  """
+
+  def __init__(
+    self,
+    slowest: int = 20,
+    slow_callback_threshold: float = 0.25,
+    profile_dir: str = './profiles',
+    profile_seconds: float = 10.0,
+  ):
+    self.timings = HandlerTimings(slowest)
+    self.watchdog = LoopWatchdog(slow_callback_threshold)
+    self.profiler = Profiler(profile_dir)
+    self.profile_seconds = profile_seconds
+    self.started = time.time()
+    self._watchdog_task = None
+
+  def wrap(self, name: str, func, describe=None):
+    """Wraps a handler to record its timings, see `HandlerTimings.wrap`."""
+    return self.timings.wrap(name, func, describe)
+
+  def setup(self, app: web.Application, admin_app: web.Application):
+    """
+    Adds a middleware timing every HTTP request to `app` and the diagnostics
+    routes to `admin_app`, both aiohttp applications that are not running yet.
+
+    The request timings include parsing and serializing the XML messages, so
+    comparing them with the handler timings shows where a request spends its time.
+    """
+    app.middlewares.append(self._time_request)
+    admin_app.add_routes(
+      [
+        web.get('/diagnostics', self.get_report),
+        web.post('/diagnostics/profile', self.post_profile),
+      ]
+    )
+
+  def start(self):
+    """
+    Starts the watchdog and installs the signal handlers in the running loop.
+
+    Does nothing if they were already started, so that every role of a node can
+    call it.
+    """
+    if self._watchdog_task is not None:
+      return
+    loop = asyncio.get_running_loop()
+    self._watchdog_task = loop.create_task(self.watchdog.run())
+    try:
+      loop.add_signal_handler(signal.SIGUSR1, self._on_profile_signal)
+      loop.add_signal_handler(signal.SIGUSR2, self.log_report)
+    except (AttributeError, NotImplementedError, RuntimeError):
+      # Not available on Windows or outside the main thread.
+      logger.debug('Diagnostics signal handlers are not available.')
+
+  def report(self) -> dict:
+    """
+    Returns the handler timings and event-loop stalls.
+
+    Returns
+    -------
+    dict
+        The uptime in seconds, the timings per handler and the recent stalls.
+    """
+    return {
+      'uptime': time.time() - self.started,
+      'handlers': self.timings.snapshot(),
+      'loop_stalls': self.watchdog.snapshot(),
+      'profiling': self.profiler.capturing,
+    }
+
+  def log_report(self):
+    logger.warning(f'Diagnostics report:\n{json.dumps(self.report(), indent=2)}')
+
+  def _on_profile_signal(self):
+    asyncio.get_running_loop().create_task(self._log_profile())
+
+  async def _log_profile(self):
+    try:
+      result = await self.profiler.capture(self.profile_seconds)
+    except (RuntimeError, ValueError) as err:
+      logger.warning(f'Profile not captured: {err}')
+      return
+    logger.warning(f'Profile saved to {result["path"]}:\n{result["summary"]}')
+
+  @web.middleware
+  async def _time_request(self, request: web.Request, handler):
+    resource = request.match_info.route.resource
+    name = f'http {request.method} {resource.canonical if resource else "unmatched"}'
+    started = time.perf_counter()
+    failed = True
+    try:
+      response = await handler(request)
+      failed = False
+      return response
+    finally:
+      self.timings.record(
+        name, time.perf_counter() - started, failed, _describe_request, (request,)
+      )
+
+  async def get_report(self, request: web.Request) -> web.Response:
+    return web.json_response(self.report(), dumps=_dumps)
+
+  async def post_profile(self, request: web.Request) -> web.Response:
+    """
+    Captures a profile and returns its path and summary.
+
+    Raises
+    ------
+    aiohttp.web.HTTPBadRequest
+        If a query parameter is invalid.
+    aiohttp.web.HTTPConflict
+        If another capture is running.
+    """
+    try:
+      seconds = float(request.query.get('seconds', self.profile_seconds))
+    except ValueError:
+      raise web.HTTPBadRequest(text='seconds must be a number.') from None
+    try:
+      result = await self.profiler.capture(
+        seconds, request.query.get('engine', 'cprofile')
+      )
+    except ValueError as err:
+      raise web.HTTPBadRequest(text=str(err)) from None
+    except RuntimeError as err:
+      raise web.HTTPConflict(text=str(err)) from None
+    return web.json_response(result)
+
+
+def create_diagnostics(config):
+  """
+  Creates the diagnostics from the node configuration.
+
+  Returns
+  -------
+  Diagnostics or None
+      None if diagnostics are disabled.
+  """
+  if not config.diagnostics_enabled:
+    return None
+  return Diagnostics(
+    slowest=config.diagnostics_slowest,
+    slow_callback_threshold=config.slow_callback_threshold,
+    profile_dir=config.profile_dir,
+    profile_seconds=config.profile_seconds,
+  )
+
+
+def _describe_request(request):
+  return {'path': request.path, 'content_length': request.content_length}
+
+
+def _dumps(value):
+  return json.dumps(value, default=str)
@@ -0,0 +1,202 @@
+import functools
+import heapq
+import inspect
+import itertools
+import logging
+import time
+from datetime import timedelta
+
+logger = logging.getLogger(__name__)
+
+
+class _HandlerStats:
+  __slots__ = ('count', 'errors', 'max', 'slowest', 'total')
+
+  def __init__(self):
+    self.clear()
+
+  def clear(self):
+    self.count = 0
+    self.total = 0.0
+    self.max = 0.0
+    self.errors = 0
+    # Min-heap of (duration, sequence, arguments), the fastest of the slowest on top.
+    self.slowest = []
+
+
+class HandlerTimings:
+  """
+  Times handler invocations and keeps the slowest N of each handler.
+
+  Every call costs two clock reads and a few additions. The arguments of a call
+  are only summarized when it is slow enough to enter the slowest N, so the
+  timings are cheap enough to leave enabled.
+
+  Attributes
+  ----------
+  slowest : int
+      The number of slowest invocations kept per handler.
+  """
+
+  def __init__(self, slowest: int = 20):
+    self.slowest = slowest
+    self._stats = {}
+    self._sequence = itertools.count()
+
+  def wrap(self, name: str, func, describe=None):
+    """
+    Returns `func` wrapped to record its timings under `name`.
+
+    The wrapper keeps the signature of `func`, which openleadr inspects for some
+    handlers, and is a coroutine function if `func` is one.
+
+    Parameters
+    ----------
+    name : str
+        The name the timings are recorded under.
+    func : callable
+        The function or coroutine function to time.
+    describe : callable, optional
+        Called with the arguments of a slow call, returns a dict summarizing
+        them. By default strings and numbers are kept and collections are
+        replaced by their length, e.g. a ven_id and a batch size.
+
+    Returns
+    -------
+    callable
+        The wrapped function.
+    """
+    stats = self._stats.setdefault(name, _HandlerStats())
+    describe = describe or _argument_summary(func)
+
+    if inspect.iscoroutinefunction(func):
+
+      @functools.wraps(func)
+      async def timed(*args, **kwargs):
+        started = time.perf_counter()
+        failed = True
+        try:
+          result = await func(*args, **kwargs)
+          failed = False
+          return result
+        finally:
+          self._record(
+            stats, time.perf_counter() - started, failed, describe, args, kwargs
+          )
+
+    else:
+
+      @functools.wraps(func)
+      def timed(*args, **kwargs):
+        started = time.perf_counter()
+        failed = True
+        try:
+          result = func(*args, **kwargs)
+          failed = False
+          return result
+        finally:
+          self._record(
+            stats, time.perf_counter() - started, failed, describe, args, kwargs
+          )
+
+    return timed
+
+  def record(
+    self,
+    name: str,
+    seconds: float,
+    failed: bool = False,
+    describe=None,
+    args=(),
+    kwargs=None,
+  ):
+    """
+    Records an invocation timed by the caller, e.g. by a middleware.
+
+    `describe` is called with `args` and `kwargs` if the invocation enters the
+    slowest N.
+    """
+    stats = self._stats.get(name)
+    if stats is None:
+      stats = self._stats[name] = _HandlerStats()
+    self._record(stats, seconds, failed, describe or _no_arguments, args, kwargs or {})
+
+  def _record(self, stats, duration, failed, describe, args, kwargs):
+    stats.count += 1
+    stats.total += duration
+    stats.errors += failed
+    stats.max = max(stats.max, duration)
+
+    slowest = stats.slowest
+    if len(slowest) < self.slowest or duration > slowest[0][0]:
+      try:
+        arguments = describe(*args, **kwargs)
+      except Exception as err:
+        # A broken describer must not fail the handler it describes.
+        logger.debug(f'Describing a call of {describe!r} failed.', exc_info=True)
+        arguments = {'error': repr(err)}
+      entry = (duration, next(self._sequence), arguments)
+      if len(slowest) < self.slowest:
+        heapq.heappush(slowest, entry)
+      else:
+        heapq.heapreplace(slowest, entry)
+
+  def snapshot(self) -> dict:
+    """
+    Returns the timings of every handler, slowest invocations first.
+
+    Returns
+    -------
+    dict
+        Per handler name the count, errors, mean and max seconds and a list of
+        the slowest invocations with their seconds and arguments.
+    """
+    return {
+      name: {
+        'count': stats.count,
+        'errors': stats.errors,
+        'mean': stats.total / stats.count if stats.count else 0.0,
+        'max': stats.max,
+        'slowest': [
+          {'seconds': duration, 'arguments': arguments}
+          for duration, _, arguments in sorted(stats.slowest, reverse=True)
+        ],
+      }
+      for name, stats in self._stats.items()
+    }
+
+  def reset(self):
+    """Clears the timings of all handlers."""
+    for stats in self._stats.values():
+      stats.clear()
+
+
+def _argument_summary(func):
+  try:
+    parameters = list(inspect.signature(func).parameters)
+  except (TypeError, ValueError):
+    parameters = []
+
+  def describe(*args, **kwargs):
+    names = itertools.chain(parameters, (f'arg{index}' for index in itertools.count()))
+    arguments = dict(zip(names, args, strict=False))
+    arguments.update(kwargs)
+    return {name: _summarize(value) for name, value in arguments.items()}
+
+  return describe
+
+
+def _no_arguments(*args, **kwargs):
+  return {}
+
+
+def _summarize(value):
+  if value is None or isinstance(value, (bool, int, float)):
+    return value
+  if isinstance(value, timedelta):
+    return value.total_seconds()
+  if isinstance(value, str):
+    return value if len(value) <= 100 else value[:100] + '...'
+  if isinstance(value, (list, tuple, set, dict)):
+    return {'len': len(value)}
+  return type(value).__name__
@@ -0,0 +1,103 @@
+import asyncio
+import collections
+import logging
+import sys
+import threading
+import time
+import traceback
+from datetime import UTC, datetime
+
+logger = logging.getLogger(__name__)
+
+
+class LoopWatchdog:
+  """
+  Detects callbacks that block the event loop and captures what they were doing.
+
+  A heartbeat coroutine on the loop records when it last ran. A daemon thread
+  checks the heartbeat and, when it is more than `threshold` seconds late, takes
+  the stack of the loop thread with `sys._current_frames`, which shows the
+  callback blocking the loop while it still blocks it. Unlike the debug mode of
+  asyncio, this costs nothing per callback and can stay enabled.
+
+  Attributes
+  ----------
+  threshold : float
+      The seconds the loop may be blocked before a stall is recorded.
+  interval : float
+      The seconds between two heartbeats.
+  stalls : collections.deque
+      The most recent stalls, as dicts with the wall time, the blocked seconds
+      and the captured stack.
+  """
+
+  def __init__(
+    self, threshold: float = 0.25, interval: float = 0.05, max_stalls: int = 50
+  ):
+    self.threshold = threshold
+    self.interval = interval
+    self.stalls = collections.deque(maxlen=max_stalls)
+    self.stall_count = 0
+    self._beat = time.monotonic()
+    self._stall = None
+    self._loop_thread_id = None
+    self._thread = None
+    self._stopped = threading.Event()
+
+  async def run(self):
+    """
+    Beats the heartbeat in the running loop and watches it from a thread until
+    cancelled.
+    """
+    self._loop_thread_id = threading.get_ident()
+    self._beat = time.monotonic()
+    self._stopped.clear()
+    self._thread = threading.Thread(
+      target=self._watch, name='loop-watchdog', daemon=True
+    )
+    self._thread.start()
+
+    try:
+      while True:
+        await asyncio.sleep(self.interval)
+        now = time.monotonic()
+        stall = self._stall
+        if stall is not None:
+          # The loop is running again, record how long it was blocked in total.
+          stall['seconds'] = now - self._beat - self.interval
+          self._stall = None
+        self._beat = now
+    finally:
+      # A cancelled heartbeat would otherwise look like a blocked loop.
+      self._stopped.set()
+
+  def _watch(self):
+    while not self._stopped.wait(self.interval / 2):
+      lag = time.monotonic() - self._beat - self.interval
+      if lag > self.threshold and self._stall is None:
+        self._capture(lag)
+
+  def _capture(self, lag: float):
+    frame = sys._current_frames().get(self._loop_thread_id)
+    stack = traceback.format_stack(frame) if frame is not None else []
+    stall = {
+      'time': datetime.now(tz=UTC).isoformat(),
+      'seconds': lag,
+      'stack': stack,
+    }
+    self._stall = stall
+    self.stalls.append(stall)
+    self.stall_count += 1
+    logger.warning(
+      f'Event loop blocked for more than {lag:.3f}s in:\n{"".join(stack[-5:])}'
+    )
+
+  def snapshot(self) -> dict:
+    """
+    Returns the number of stalls so far and the most recent ones, newest first.
+    """
+    return {
+      'threshold': self.threshold,
+      'count': self.stall_count,
+      'recent': list(reversed(self.stalls)),
+    }
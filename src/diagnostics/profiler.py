@@ -0,0 +1,122 @@
+import asyncio
+import cProfile
+import io
+import logging
+import pstats
+from datetime import UTC, datetime
+from pathlib import Path
+
+try:
+  import yappi
+except ImportError:
+  yappi = None
+
+logger = logging.getLogger(__name__)
+
+PROFILER_ENGINES = ('cprofile', 'yappi')
+
+
+class Profiler:
+  """
+  Captures on-demand profiles of the running process for a time window.
+
+  'cprofile' profiles the event-loop thread and needs nothing beyond the
+  standard library. 'yappi' profiles all threads and attributes the wall time
+  of coroutines correctly, it is used if the optional yappi package is
+  installed. Profiles are saved in pstats format, readable with `pstats` or
+  snakeviz. Only one capture runs at a time and no profiler is active between
+  captures.
+
+  Attributes
+  ----------
+  output_dir : pathlib.Path
+      The directory the profiles are saved in.
+  max_seconds : float
+      The longest capture window that may be requested.
+  """
+
+  def __init__(self, output_dir='./profiles', max_seconds: float = 300.0):
+    self.output_dir = Path(output_dir)
+    self.max_seconds = max_seconds
+    self.capturing = False
+
+  async def capture(
+    self, seconds: float, engine: str = 'cprofile', top: int = 30
+  ) -> dict:
+    """
+    Profiles the process for `seconds` and saves the profile.
+
+    Parameters
+    ----------
+    seconds : float
+        The length of the capture window, at most `max_seconds`.
+    engine : str
+        'cprofile' or 'yappi'.
+    top : int
+        The number of functions in the returned summary.
+
+    Returns
+    -------
+    dict
+        The engine, the seconds, the path of the saved profile and a summary of
+        the `top` functions by cumulative time.
+
+    Raises
+    ------
+    ValueError
+        If the engine is unknown or not installed, or `seconds` is out of range.
+    RuntimeError
+        If another capture is running.
+    """
+    if engine not in PROFILER_ENGINES:
+      raise ValueError(f'engine must be one of {", ".join(PROFILER_ENGINES)}.')
+    if engine == 'yappi' and yappi is None:
+      raise ValueError('yappi is not installed.')
+    if not 0 < seconds <= self.max_seconds:
+      raise ValueError(f'seconds must be between 0 and {self.max_seconds}.')
+    if self.capturing:
+      raise RuntimeError('A profile is already being captured.')
+
+    self.capturing = True
+    try:
+      self.output_dir.mkdir(parents=True, exist_ok=True)
+      stamp = datetime.now(tz=UTC).strftime('%Y%m%dT%H%M%S%f')
+      path = self.output_dir / f'profile-{engine}-{stamp}.pstats'
+      logger.info(f'Capturing a {seconds}s {engine} profile.')
+      if engine == 'cprofile':
+        await self._capture_cprofile(seconds, path)
+      else:
+        await self._capture_yappi(seconds, path)
+    finally:
+      self.capturing = False
+
+    summary = io.StringIO()
+    pstats.Stats(str(path), stream=summary).sort_stats('cumulative').print_stats(top)
+    logger.info(f'Saved profile to {path}.')
+    return {
+      'engine': engine,
+      'seconds': seconds,
+      'path': str(path),
+      'summary': summary.getvalue(),
+    }
+
+  async def _capture_cprofile(self, seconds, path):
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+      await asyncio.sleep(seconds)
+    finally:
+      profile.disable()
+    profile.dump_stats(str(path))
+
+  async def _capture_yappi(self, seconds, path):
+    yappi.set_clock_type('wall')
+    yappi.start()
+    try:
+      await asyncio.sleep(seconds)
+    finally:
+      yappi.stop()
+    try:
+      yappi.get_func_stats().save(str(path), type='pstat')
+    finally:
+      yappi.clear_stats()
@@ -2,5 +2,16 @@
 
 __version__ = '1.0.0'
 
-from .live_charting import LiveCharting
-from .dummy_db import DataGenerator
+from ..util.lazy_exports import lazy_exports
+
+__all__ = ['DataGenerator', 'LiveCharting']
+
+# Exported names are resolved on first access, so importing the package does not
+# pull in dash, plotly and pandas until the charts are actually used.
+__getattr__ = lazy_exports(
+  globals(),
+  {
+    'DataGenerator': '.dummy_db',
+    'LiveCharting': '.live_charting',
+  },
+)
@@ -1,62 +1,248 @@
-import os
-import sqlite3
-import random
+import argparse
 import asyncio
+import logging
+import time
+from datetime import UTC, datetime, timedelta
+
+import numpy as np
+
+from src.storage import create_storage
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 86400
+
+# Base level, daily swing, noise and default event threshold of the synthetic
+# traces per measurement.
+PROFILES = {
+  'voltage': {'base': 230.0, 'amplitude': 6.0, 'noise': 1.5, 'threshold': 200.0},
+  'power': {'base': 4.0, 'amplitude': 2.5, 'noise': 0.3, 'threshold': 1.0},
+}
 
 
 class DataGenerator:
-  def __init__(self, db_name='test_data.db', table_name='data'):
-    self.db_name = db_name
-    self.table_name = table_name
-
-    db_directory = os.path.dirname(self.db_name)
-    os.makedirs(db_directory, exist_ok=True)
-
-    self.conn = sqlite3.connect(self.db_name)
-    self.cursor = self.conn.cursor()
-    self._create_table()
-
-  def _create_table(self):
-    self.cursor.execute(
-      f"""
-            CREATE TABLE IF NOT EXISTS {self.table_name} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                value REAL
-            )
-        """
-    )
-    self.conn.commit()
-
-  def insert_data(self, value):
-    self.cursor.execute(
-      f"""
-            INSERT INTO {self.table_name} (value)
-            VALUES (?)
-        """,
-      (value,),
+  """
+  A synthetic workload generator for the storage and charting path.
+
+  Produces per-VEN voltage or power traces with a daily seasonality, gaussian
+  noise and occasional dips below the event threshold. Rows are generated as
+  vectorized numpy batches and written with `store_many_values`, one
+  transaction per batch, into the real 'metervalues' schema. The generator
+  paces itself to a target number of rows per second and reports the
+  throughput it achieved.
+
+  Simulated time advances by `sample_interval` seconds per sample of a VEN,
+  independently of the write rate, so a short run covers days of traces while
+  the ingest rate is set by `rows_per_second` alone.
+
+  Attributes
+  ----------
+  storage : StorageInterface
+      The storage backend the rows are written to.
+  ven_ids : list of str
+      The VENs a trace is generated for.
+  rows_per_second : float
+      The target ingest rate across all VENs.
+  batch_size : int
+      The approximate number of rows per batch and transaction.
+  sample_interval : float
+      The simulated seconds between two samples of one VEN.
+  """
+
+  def __init__(
+    self,
+    db_name='./src/database/openleadr.db',
+    storage_backend='sqlite',
+    ven_count=100,
+    rows_per_second=10_000,
+    batch_size=5_000,
+    sample_interval=10.0,
+    measurement='voltage',
+    event_threshold=None,
+    dip_probability=0.001,
+    dip_length=30,
+    seed=None,
+  ):
+    """
+    Parameters
+    ----------
+    db_name : str
+        The database file or path used by the storage backend.
+    storage_backend : str
+        One of the backends known to `create_storage`.
+    ven_count : int
+        The number of synthetic VENs.
+    rows_per_second : float
+        The target ingest rate across all VENs.
+    batch_size : int
+        The approximate number of rows per batch and transaction.
+    sample_interval : float
+        The simulated seconds between two samples of one VEN.
+    measurement : str
+        The trace profile, 'voltage' or 'power'.
+    event_threshold : float, optional
+        Dips drop the trace below this value, defaults to the profile's threshold.
+    dip_probability : float
+        The probability that a dip starts at a given sample of a VEN.
+    dip_length : int
+        The number of samples a dip lasts.
+    seed : int, optional
+        Seed of the random generator, for reproducible traces.
+    """
+    self.storage = create_storage(storage_backend, db_name)
+    self.ven_ids = [f'dummy-ven-{index:06d}' for index in range(ven_count)]
+    self.rows_per_second = rows_per_second
+    self.profile = PROFILES[measurement]
+    self.event_threshold = event_threshold or self.profile['threshold']
+    self.dip_probability = dip_probability
+    self.dip_length = dip_length
+    self.rng = np.random.default_rng(seed)
+
+    # Every batch holds the same number of samples for every VEN.
+    self.steps_per_batch = max(1, batch_size // ven_count)
+    self.batch_size = self.steps_per_batch * ven_count
+    self.sample_interval = sample_interval
+
+    self._phases = self.rng.uniform(0, 2 * np.pi, ven_count)
+    self._offsets = self.rng.normal(0, self.profile['noise'], ven_count)
+    self._dip_remaining = np.zeros(ven_count, dtype=np.int64)
+    self._step = 0
+    self._start_time = datetime.now(tz=UTC)
+
+  def generate_batch(self) -> tuple:
+    """
+    Generates the next batch of samples for all VENs.
+
+    Returns
+    -------
+    tuple
+        (times, values) with a list of `steps_per_batch` datetimes and a
+        (steps_per_batch, ven_count) array of values.
+    """
+    steps = self.steps_per_batch
+    index = np.arange(steps)
+    seconds = (self._step + index) * self.sample_interval
+
+    daily = np.sin(2 * np.pi * seconds[:, None] / SECONDS_PER_DAY + self._phases)
+    values = self.profile['base'] + self._offsets + self.profile['amplitude'] * daily
+    values += self.rng.normal(0, self.profile['noise'], values.shape)
+
+    # A dip lasts `dip_length` samples from the step it started at. Dips still
+    # running from the previous batch are carried over in `_dip_remaining`.
+    starts = self.rng.random(values.shape) < self.dip_probability
+    last_start = np.where(starts, index[:, None], -self.dip_length)
+    last_start = np.maximum.accumulate(last_start, axis=0)
+    in_dip = (index[:, None] - last_start < self.dip_length) | (
+      index[:, None] < self._dip_remaining
     )
-    self.conn.commit()
+    dip_depth = self.rng.uniform(0.05, 0.2, values.shape) * self.event_threshold
+    values = np.where(in_dip, self.event_threshold - dip_depth, values)
+
+    self._dip_remaining = np.maximum(
+      self._dip_remaining - steps, last_start[-1] + self.dip_length - steps
+    ).clip(min=0)
 
-  async def generate_data(self, duration=10, interval=1):
-    for _ in range(duration):
-      value = random.uniform(0, 100)
-      self.insert_data(value)
-      print(f'Inserted value: {value}')
-      await asyncio.sleep(interval)
+    times = [self._start_time + timedelta(seconds=float(second)) for second in seconds]
+    self._step += steps
+    return times, values
+
+  def write_batch(self, times: list, values) -> int:
+    """
+    Writes a batch in a single transaction.
+
+    Returns
+    -------
+    int
+        The number of rows written.
+    """
+    ven_ids = self.ven_ids
+    rows = [
+      (ven_id, timestamp, value)
+      for timestamp, row in zip(times, values.tolist(), strict=True)
+      for ven_id, value in zip(ven_ids, row, strict=True)
+    ]
+    self.storage.store_many_values(rows)
+    return len(rows)
+
+  async def generate_data(self, duration=10, report_interval=5):
+    """
+    Generates and writes batches at the target rate.
+
+    Parameters
+    ----------
+    duration : float
+        How long to generate data for, in seconds.
+    report_interval : float
+        How often the achieved throughput is logged, in seconds.
+
+    Returns
+    -------
+    dict
+        The rows written, the elapsed seconds and the achieved rows per second.
+    """
+    rows = 0
+    began = time.perf_counter()
+    last_report = began
+
+    while time.perf_counter() - began < duration:
+      rows += self.write_batch(*self.generate_batch())
+
+      now = time.perf_counter()
+      if now - last_report >= report_interval:
+        logger.info(f'Wrote {rows} rows, {rows / (now - began):.0f} rows/s.')
+        last_report = now
+
+      # Sleep until the rows written so far are due at the target rate.
+      await asyncio.sleep(max(0.0, rows / self.rows_per_second - (now - began)))
+
+    elapsed = time.perf_counter() - began
+    return {'rows': rows, 'seconds': elapsed, 'rows_per_second': rows / elapsed}
 
   def close(self):
-    self.conn.close()
+    self.storage.close()
 
-  async def generate_interval_data(self):
-    await self.generate_data(duration=3600, interval=1)
 
+def main():
+  parser = argparse.ArgumentParser(description='Generate synthetic meter values.')
+  parser.add_argument('--db-name', default='./src/database/openleadr.db')
+  parser.add_argument('--backend', default='sqlite')
+  parser.add_argument('--vens', type=int, default=100)
+  parser.add_argument('--rows-per-second', type=float, default=10_000)
+  parser.add_argument('--batch-size', type=int, default=5_000)
+  parser.add_argument(
+    '--sample-interval',
+    type=float,
+    default=10.0,
+    help='Simulated seconds between two samples of one VEN.',
+  )
+  parser.add_argument('--measurement', choices=sorted(PROFILES), default='voltage')
+  parser.add_argument('--duration', type=float, default=60)
+  parser.add_argument('--seed', type=int, default=None)
+  args = parser.parse_args()
 
-# Usage
-if __name__ == '__main__':
-  generator = DataGenerator()
+  logging.basicConfig(level=logging.INFO)
+  generator = DataGenerator(
+    db_name=args.db_name,
+    storage_backend=args.backend,
+    ven_count=args.vens,
+    rows_per_second=args.rows_per_second,
+    batch_size=args.batch_size,
+    sample_interval=args.sample_interval,
+    measurement=args.measurement,
+    seed=args.seed,
+  )
 
   try:
-    asyncio.run(generator.generate_data(duration=3600, interval=1))
+    result = asyncio.run(generator.generate_data(duration=args.duration))
+    print(
+      f'Wrote {result["rows"]} rows in {result["seconds"]:.1f}s,'
+      f' {result["rows_per_second"]:.0f} rows/s'
+      f' (target {args.rows_per_second:.0f}).'
+    )
   finally:
     generator.close()
+
+
+# Usage
+if __name__ == '__main__':
+  main()
@@ -1,10 +1,10 @@
 import dash
 from dash import dcc, html
 import dash.dependencies as dd
-import sqlite3
 import pandas as pd
 
 from src.openleadr_node.config.config import Config
+from src.storage import create_storage
 
 
 class LiveCharting:
@@ -15,18 +15,22 @@ class LiveCharting:
   ----------
   app : dash.Dash
       The Dash application instance.
+  storage : StorageInterface
+      The storage backend selected by the config.
+  report_stats : ReportStatistics or None
+      The running report statistics of a VTN in the same process, if any.
 
   Methods
   -------
   initAppLayout()
       Initializes the layout of the Dash application.
   get_data()
-      Retrieves data from an SQLite database and returns it as a DataFrame.
+      Retrieves data from the storage backend and returns it as a DataFrame.
   register_callbacks()
       Registers the callback functions for updating the live graph.
   """
 
-  def __init__(self, db_name, table_name, config: Config):
+  def __init__(self, db_name, table_name, config: Config, report_stats=None):
     """
     Initializes the LiveCharting class, setting up the Dash application,
     layout, and callback functions.
@@ -36,19 +40,22 @@ class LiveCharting:
     self.table_name = table_name
     self.app = dash.Dash(__name__)
     self.config = config  # Store the config instance
+    self.storage = create_storage(config.get_storage_backend(), db_name)
+    self.report_stats = report_stats
     self.initAppLayout()
     self.register_callbacks()
 
   def initAppLayout(self):
     """
     Initializes the layout of the Dash application with a graph component,
-    an interval component to trigger updates, and an h1 component to display
-    the ven_id dynamically.
+    an interval component to trigger updates, an h1 component to display
+    the ven_id dynamically and a table with the report stream statistics.
     """
     self.app.layout = html.Div(
       [
         dcc.Graph(id='live-graph'),
         html.H1(id='ven-id-display'),  # h1 element for displaying ven_id
+        html.Table(id='stream-stats'),
         dcc.Interval(
           id='interval-component',
           interval=1 * 1000,  # Update every second
@@ -59,23 +66,18 @@ class LiveCharting:
 
   def get_data(self):
     """
-    Retrieves data from an SQLite database.
+    Retrieves data from the storage backend.
 
-    Connects to the database, executes a query to fetch all data from the
-    'data' table, and returns it as a pandas DataFrame.
+    Fetches the meter values of the current VEN and returns them as a pandas
+    DataFrame.
 
     Returns
     -------
     pandas.DataFrame
-        DataFrame containing the data from the database.
+        DataFrame with 'time' and 'value' columns.
     """
-    conn = sqlite3.connect(self.db_name)
-    query = (
-      f"SELECT * FROM {self.table_name} WHERE ven_id = '{self.config.get_ven_id()}'"
-    )
-    df = pd.read_sql_query(query, conn)
-    conn.close()
-    return df
+    rows = self.storage.fetch_values(self.config.get_ven_id())
+    return pd.DataFrame(rows, columns=['time', 'value'])
 
   def register_callbacks(self):
     """
@@ -111,7 +113,7 @@ class LiveCharting:
       figure = {
         'data': [{'x': df['time'], 'y': df['value'], 'type': 'line', 'name': 'Value'}],
         'layout': {
-          'title': 'Live Data from SQLite Database',
+          'title': 'Live Meter Data',
           'uirevision': 'live-graph',  # Preserve user interaction state
           'xaxis': {
             'range': relayoutData.get('xaxis.range', [None, None]),
@@ -146,6 +148,40 @@ class LiveCharting:
       ven_id = self.config.get_ven_id()  # Get ven_id from the config
       return f'VEN ID: {ven_id}'  # Return ven_id as a string
 
+    @self.app.callback(
+      dd.Output('stream-stats', 'children'),
+      [dd.Input('interval-component', 'n_intervals')],
+    )
+    def update_stream_stats(n):
+      """
+      Updates the table with the report stream statistics of the current ven_id.
+
+      Parameters
+      ----------
+      n : int
+          The number of intervals elapsed since the last update.
+
+      Returns
+      -------
+      list
+          The header and one row per report stream.
+      """
+      if self.report_stats is None:
+        return []
+
+      columns = ['resource_id', 'measurement', 'count', 'ewma', 'mean', 'stddev']
+      columns += ['min', 'max', 'last_seen', 'jitter']
+      rows = [html.Tr([html.Th(column) for column in columns])]
+      for snapshot in self.report_stats.snapshot_ven(self.config.get_ven_id()):
+        rows.append(html.Tr([html.Td(_format_stat(snapshot[c])) for c in columns]))
+      return rows
+
+
+def _format_stat(value):
+  if isinstance(value, float):
+    return f'{value:.2f}'
+  return str(value)
+
 
 if __name__ == '__main__':
   chart = LiveCharting()
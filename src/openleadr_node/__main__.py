@@ -1,53 +1,134 @@
+import argparse
 import asyncio
+import importlib
 import os
 import threading
 from pathlib import Path
+
 from dotenv import load_dotenv
 
-from src.client import OpenLeADRClient
-from src.live_charting import LiveCharting, DataGenerator
-from src.openleadr_node.config.config import Container, Config
+from src.openleadr_node.config.config import Config, Container
 from src.openleadr_node.dependencies.venInterface import VenDependencyInterface
-from src.openleadr_node.dependencies.ven_dependency import VenDependency
-from src.server import OpenLeADRServer
 
 current_path = Path.cwd()
 shutdown_event = threading.Event()
 
+# The module behind each role is only imported when the role is selected, so a
+# VTN-only or VEN-only node never loads dash, plotly or pandas.
+ROLE_MODULES = {
+  'vtn': 'src.server.openleadr_server',
+  'ven': 'src.client.openleadr_client',
+  'charts': 'src.live_charting.live_charting',
+}
+DEFAULT_ROLES = 'vtn,ven,charts'
+
+
+def import_role(role: str):
+  return importlib.import_module(ROLE_MODULES[role])
+
+
+def parse_roles(value: str) -> list:
+  """
+  Parses a comma separated list of roles.
+
+  Raises
+  ------
+  argparse.ArgumentTypeError
+      If the list is empty or contains an unknown role.
+  """
+  roles = [role.strip() for role in value.split(',') if role.strip()]
+  unknown = [role for role in roles if role not in ROLE_MODULES]
+  if not roles or unknown:
+    raise argparse.ArgumentTypeError(
+      f'Invalid roles {value!r}, choose from {", ".join(ROLE_MODULES)}.'
+    )
+  return roles
+
 
-def get_leadr_server(config: Config):
-  return OpenLeADRServer(os.getenv('SERVER_NAME'), os.getenv('DB_NAME'), config)
+def get_leadr_server(config: Config, diagnostics=None):
+  server_module = import_role('vtn')
+  return server_module.OpenLeADRServer(
+    os.getenv('SERVER_NAME'), os.getenv('DB_NAME'), config, diagnostics
+  )
 
 
-def get_leadr_client(config: Config, controller: VenDependencyInterface):
-  return OpenLeADRClient(os.getenv('VEN_NAME'), os.getenv('VTN_URL'), controller)
+def get_leadr_client(
+  config: Config, controller: VenDependencyInterface, diagnostics=None
+):
+  client_module = import_role('ven')
+  return client_module.OpenLeADRClient(
+    os.getenv('VEN_NAME'), os.getenv('VTN_URL'), controller, diagnostics
+  )
 
 
-def get_dash_app(config: Config):
-  return LiveCharting(os.getenv('DB_NAME'), os.getenv('METERVALUES_BD_NAME'), config)
+def get_diagnostics(config: Config):
+  from src.diagnostics import create_diagnostics
 
+  return create_diagnostics(config)
 
-def get_data_generator():
-  return DataGenerator('./src/database/dummy_data_db', 'dummy_data_table')
 
+def get_dash_app(config: Config, report_stats=None):
+  charts_module = import_role('charts')
+  return charts_module.LiveCharting(
+    os.getenv('DB_NAME'), os.getenv('METERVALUES_BD_NAME'), config, report_stats
+  )
 
-def run_dash_app(config: Config):
-  dash = get_dash_app(config)
+
+def get_data_generator(config: Config):
+  from src.live_charting.dummy_db import DataGenerator
+
+  return DataGenerator(os.getenv('DB_NAME'), config.get_storage_backend())
+
+
+def run_dash_app(config: Config, report_stats=None):
+  dash = get_dash_app(config, report_stats)
   dash.app.run_server(debug=True, use_reloader=False)
 
 
-def main():
+def parse_args(argv=None):
+  parser = argparse.ArgumentParser(
+    prog='python -m src.openleadr_node', description='Run an OpenLeADR node.'
+  )
+  parser.add_argument(
+    '--roles',
+    type=parse_roles,
+    default=parse_roles(os.getenv('NODE_ROLES', DEFAULT_ROLES)),
+    help=f'Comma separated roles to start (default: {DEFAULT_ROLES}).',
+  )
+  return parser.parse_args(argv)
+
+
+def main(argv=None):
   load_dotenv()
+  args = parse_args(argv)
 
   container = Container()
   config = container.config()
-  client_controller = VenDependency()
   loop = asyncio.get_event_loop()
-  loop.create_task(get_leadr_server(config).server.run())
-  loop.create_task(get_leadr_client(config, client_controller).client.run())
-
-  # Start the Dash app in a separate thread
-  threading.Thread(target=run_dash_app, args=(config,), daemon=True).start()
+  report_stats = None
+  diagnostics = None
+
+  if 'vtn' in args.roles or 'ven' in args.roles:
+    # One diagnostics instance covers both roles of the node.
+    diagnostics = get_diagnostics(config)
+    if diagnostics is not None:
+      loop.call_soon(diagnostics.start)
+
+  if 'vtn' in args.roles:
+    leadr_server = get_leadr_server(config, diagnostics)
+    report_stats = leadr_server.report_stats
+    loop.create_task(leadr_server.run())
+
+  if 'ven' in args.roles:
+    from src.openleadr_node.dependencies.ven_dependency import VenDependency
+
+    loop.create_task(get_leadr_client(config, VenDependency(), diagnostics).run())
+
+  if 'charts' in args.roles:
+    # Start the Dash app in a separate thread
+    threading.Thread(
+      target=run_dash_app, args=(config, report_stats), daemon=True
+    ).start()
 
   # Run your asyncio tasks here
   loop.run_forever()
@@ -7,6 +7,54 @@ class Config:
   def __init__(self, initial_ven_id: int):
     self.ven_id = initial_ven_id
     self.ven_name = os.getenv('DB_NAME')
+    # One of 'sqlite', 'memory' or 'log', see src.storage.create_storage.
+    self.storage_backend = os.getenv('STORAGE_BACKEND', 'sqlite')
+    # Event rules: a VEN gets an event when the EWMA of one of its
+    # `event_threshold_measurement` streams drops below the threshold, or when a
+    # value of any stream is more than `anomaly_zscore` deviations off its mean.
+    self.event_threshold = float(os.getenv('EVENT_THRESHOLD', '200'))
+    self.event_threshold_measurement = os.getenv(
+      'EVENT_THRESHOLD_MEASUREMENT', 'voltage'
+    )
+    self.anomaly_zscore = float(os.getenv('ANOMALY_ZSCORE', '4'))
+    self.stats_ewma_alpha = float(os.getenv('STATS_EWMA_ALPHA', '0.1'))
+    # The report measurement the event scheduler uses as a VEN's load in kW.
+    self.dispatch_measurement = os.getenv('DISPATCH_MEASUREMENT', 'RealPower')
+    # Readings older than this many seconds are not used as a VEN's load.
+    self.dispatch_max_age = float(os.getenv('DISPATCH_MAX_AGE', '300'))
+    # The admin HTTP site of the VTN, serving the scheduler and diagnostics routes.
+    # Keep it on the loopback interface, anyone who can reach it can issue events to
+    # every VEN.
+    self.admin_host = os.getenv('ADMIN_HOST', '127.0.0.1')
+    self.admin_port = int(os.getenv('ADMIN_PORT', '8081'))
+    # How report sampling intervals are negotiated: 'min', 'max' or 'load', see
+    # src.server.sampling_policy. The load is the number of report streams
+    # relative to the capacity.
+    self.sampling_policy = os.getenv('SAMPLING_POLICY', 'load')
+    self.sampling_stream_capacity = int(os.getenv('SAMPLING_STREAM_CAPACITY', '10000'))
+    # Limits of the sampling governor: the ingest queue depth (in reports) and the
+    # event-loop lag (in seconds) that count as full load, and the load above which
+    # existing report streams are downgraded.
+    self.max_ingest_queue = int(os.getenv('MAX_INGEST_QUEUE', '10000'))
+    self.max_loop_lag = float(os.getenv('MAX_LOOP_LAG', '0.2'))
+    self.overload_threshold = float(os.getenv('OVERLOAD_THRESHOLD', '0.9'))
+    # Admission control of registrations: sustained rate per second, burst size and
+    # registrations in flight. Registration writes are committed in batches
+    # collected for up to REGISTRATION_BATCH_DELAY seconds.
+    self.registration_rate = float(os.getenv('REGISTRATION_RATE', '200'))
+    self.registration_burst = int(os.getenv('REGISTRATION_BURST', '500'))
+    self.registration_concurrency = int(os.getenv('REGISTRATION_CONCURRENCY', '100'))
+    self.registration_batch_delay = float(os.getenv('REGISTRATION_BATCH_DELAY', '0.02'))
+    # Diagnostics, see src.diagnostics: the slowest invocations kept per handler, the
+    # event-loop stall recorded with its stack, and where and how long on-demand
+    # profiles are captured.
+    self.diagnostics_enabled = (
+      os.getenv('DIAGNOSTICS_ENABLED', 'true').lower() == 'true'
+    )
+    self.diagnostics_slowest = int(os.getenv('DIAGNOSTICS_SLOWEST', '20'))
+    self.slow_callback_threshold = float(os.getenv('SLOW_CALLBACK_THRESHOLD', '0.25'))
+    self.profile_dir = os.getenv('PROFILE_DIR', './profiles')
+    self.profile_seconds = float(os.getenv('PROFILE_SECONDS', '10'))
     # add additional configs....
 
   def set_ven_id(self, new_ven_id: int):
@@ -15,6 +63,9 @@ class Config:
   def get_ven_id(self):
     return self.ven_id
 
+  def get_storage_backend(self):
+    return self.storage_backend
+
 
 class Container(containers.DeclarativeContainer):
   config = providers.Singleton(Config, initial_ven_id='ven_123')
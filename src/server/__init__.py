@@ -2,4 +2,10 @@
 
 __version__ = '1.0.0'
 
-from .openleadr_server import OpenLeADRServer
+from ..util.lazy_exports import lazy_exports
+
+__all__ = ['OpenLeADRServer']
+
+# Exported names are resolved on first access, so importing the package does not
+# pull in openleadr until the server is actually used.
+__getattr__ = lazy_exports(globals(), {'OpenLeADRServer': '.openleadr_server'})
@@ -2,6 +2,7 @@
 import asyncio
 import logging
 
+from ..openleadr_node.config.config import Container
 from .openleadr_server import OpenLeADRServer
 
 logger = logging.getLogger(__name__)
@@ -13,11 +14,12 @@ def main():
   """
   server_name = 'openleadr-server'
   db_name = './src/database/openleadr.db'
-  open_leadr_server = OpenLeADRServer(server_name, db_name)
+  config = Container().config()
+  open_leadr_server = OpenLeADRServer(server_name, db_name, config)
 
   try:
     loop = asyncio.new_event_loop()
-    loop.create_task(open_leadr_server.server.run())
+    loop.create_task(open_leadr_server.run())
     loop.run_forever()
   except KeyboardInterrupt:
     logger.info('Server interrupted by user.')
@@ -0,0 +1,71 @@
+import math
+import time
+
+
+class AdmissionController:
+  """
+  Admission control for bursty requests such as registration storms.
+
+  Combines a token bucket, which limits the sustained rate and allows bursts of
+  up to `burst` requests, with a bound on the number of requests in flight.
+  Requests that are not admitted should be answered with a retryable error
+  instead of being queued.
+
+  Attributes
+  ----------
+  rate : float
+      The tokens added per second.
+  burst : int
+      The capacity of the bucket.
+  max_concurrent : int
+      The maximum number of admitted requests in flight.
+  in_flight : int
+      The number of admitted requests not yet released.
+  rejected : int
+      The number of requests rejected so far.
+  """
+
+  def __init__(
+    self, rate: float, burst: int, max_concurrent: int, clock=time.monotonic
+  ):
+    self.rate = rate
+    self.burst = burst
+    self.max_concurrent = max_concurrent
+    self.in_flight = 0
+    self.rejected = 0
+    self._clock = clock
+    self._tokens = float(burst)
+    self._updated = clock()
+
+  def try_acquire(self) -> bool:
+    """
+    Admits a request if a token and a concurrency slot are available.
+
+    Every admitted request must be released with `release`.
+
+    Returns
+    -------
+    bool
+        True if the request was admitted.
+    """
+    now = self._clock()
+    self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+    self._updated = now
+
+    if self._tokens < 1 or self.in_flight >= self.max_concurrent:
+      self.rejected += 1
+      return False
+
+    self._tokens -= 1
+    self.in_flight += 1
+    return True
+
+  def release(self):
+    self.in_flight -= 1
+
+  def retry_after(self) -> int:
+    """
+    Returns the whole seconds until the next token is available, at least 1.
+    """
+    missing = max(1.0 - self._tokens, 0.0)
+    return max(1, math.ceil(missing / self.rate))
@@ -0,0 +1,231 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+from datetime import UTC, datetime, timedelta
+
+from openleadr.objects import Interval
+
+from .report_stats import ReportStatistics
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEAD_TIME = timedelta(minutes=5)
+# Readings older than this many seconds do not count as a VEN's current load.
+DEFAULT_MAX_AGE = 300.0
+
+
+class EventScheduler:
+  """
+  Turns fleet-level demand response targets into per-VEN events.
+
+  A target such as "shed 500 kW across group G between T1 and T2" is split
+  across the VENs of the group in proportion to their latest reading of the
+  dispatch measurement, ignoring readings older than `max_age`. The per-VEN assignments wait in a heap ordered by
+  dispatch time and are issued through `OpenADRServer.add_event` in bulk once
+  they are due. Scheduling a target is O(n log n) in the size of the group and
+  dispatching is O(log n) per event, so the work grows linearly with the fleet.
+
+  Attributes
+  ----------
+  server : OpenADRServer
+      The openleadr server the events are added to.
+  report_stats : ReportStatistics
+      The running report statistics providing the latest per-VEN readings.
+  measurement : str
+      The measurement whose last value is a VEN's current load, in kW.
+  lead_time : timedelta
+      How long before the start of an assignment its event is issued.
+  max_age : float
+      How many seconds a reading counts as a VEN's current load, None to use
+      readings of any age.
+  groups : dict
+      Mapping of group names to sets of ven_ids.
+  """
+
+  def __init__(
+    self,
+    server,
+    report_stats: ReportStatistics,
+    measurement: str = 'RealPower',
+    lead_time: timedelta = DEFAULT_LEAD_TIME,
+    max_age: float | None = DEFAULT_MAX_AGE,
+    callback=None,
+  ):
+    self.server = server
+    self.report_stats = report_stats
+    self.measurement = measurement.lower()
+    self.lead_time = lead_time
+    self.max_age = max_age
+    self.callback = callback
+    self.groups = {}
+    self._pending = []
+    self._sequence = itertools.count()
+
+  def __len__(self):
+    return len(self._pending)
+
+  def add_to_group(self, group: str, *ven_ids: str):
+    self.groups.setdefault(group, set()).update(ven_ids)
+
+  def remove_from_group(self, group: str, *ven_ids: str):
+    self.groups.get(group, set()).difference_update(ven_ids)
+
+  def stale_streams(self, now: datetime | None = None) -> set:
+    """Returns the ids of streams whose last reading is older than `max_age`."""
+    if self.max_age is None:
+      return set()
+    return set(self.report_stats.stale_streams(self.max_age, now))
+
+  def latest_load(self, ven_id: str, stale: set | None = None) -> float:
+    """
+    Returns the sum of the last values of a VEN's dispatch measurement streams.
+
+    Parameters
+    ----------
+    ven_id : str
+        The VEN to sum the readings of.
+    stale : set of int, optional
+        The streams to skip, see `stale_streams`. Computed if omitted.
+
+    Returns
+    -------
+    float
+        The latest load in kW, NaN if the VEN has no recent reading of the
+        measurement.
+    """
+    if stale is None:
+      stale = self.stale_streams()
+    load = math.nan
+    for stream_id in self.report_stats.ven_stream_ids(ven_id):
+      if stream_id in stale:
+        continue
+      if self.report_stats.key(stream_id)[2].lower() != self.measurement:
+        continue
+      value = self.report_stats.last_value(stream_id)
+      if not math.isnan(value):
+        load = value if math.isnan(load) else load + value
+    return load
+
+  def assign(self, ven_ids, shed_kw: float) -> dict:
+    """
+    Splits a shed target across VENs in proportion to their latest load.
+
+    VENs without a recent reading are skipped. If the target exceeds the total load,
+    every VEN sheds its full load and the shortfall is logged.
+
+    Parameters
+    ----------
+    ven_ids : iterable of str
+        The VENs to spread the target across.
+    shed_kw : float
+        The total load to shed, in kW.
+
+    Returns
+    -------
+    dict
+        Mapping of ven_id to the kW it should shed.
+    """
+    # One pass over all streams instead of one per VEN.
+    stale = self.stale_streams()
+    loads = {}
+    for ven_id in ven_ids:
+      load = self.latest_load(ven_id, stale)
+      if not math.isnan(load) and load > 0:
+        loads[ven_id] = load
+
+    total = math.fsum(loads.values())
+    if total <= 0:
+      logger.warning(f'No VEN reported {self.measurement}, cannot shed {shed_kw} kW.')
+      return {}
+    if shed_kw > total:
+      logger.warning(f'Shed target {shed_kw} kW exceeds the fleet load of {total} kW.')
+
+    share = min(shed_kw / total, 1.0)
+    return {ven_id: load * share for ven_id, load in loads.items()}
+
+  def schedule_shed(
+    self, shed_kw: float, start: datetime, end: datetime, group: str | None = None
+  ) -> dict:
+    """
+    Schedules a fleet-level shed target.
+
+    Parameters
+    ----------
+    shed_kw : float
+        The total load to shed, in kW.
+    start : datetime
+        The start of the shed period, timezone-aware.
+    end : datetime
+        The end of the shed period, timezone-aware.
+    group : str, optional
+        The group of VENs to shed across, all VENs with statistics if omitted.
+
+    Returns
+    -------
+    dict
+        Mapping of ven_id to the kW it was assigned.
+
+    Raises
+    ------
+    ValueError
+        If the period is empty or the group is unknown.
+    """
+    if end <= start:
+      raise ValueError('The end of a shed period must be after its start.')
+    if group is None:
+      ven_ids = self.report_stats.ven_ids()
+    elif group in self.groups:
+      ven_ids = self.groups[group]
+    else:
+      raise ValueError(f'Unknown group {group!r}.')
+
+    assignments = self.assign(ven_ids, shed_kw)
+    dispatch_at = (start - self.lead_time).timestamp()
+    # Extending and re-heapifying is linear, pushing one by one would be n log n.
+    self._pending.extend(
+      (dispatch_at, next(self._sequence), ven_id, kw, start, end)
+      for ven_id, kw in assignments.items()
+    )
+    heapq.heapify(self._pending)
+    return assignments
+
+  def dispatch_due(self, now: datetime | None = None) -> int:
+    """
+    Issues the events of all assignments that are due.
+
+    Parameters
+    ----------
+    now : datetime, optional
+        The current time, defaults to now in UTC.
+
+    Returns
+    -------
+    int
+        The number of events issued.
+    """
+    now = (now or datetime.now(tz=UTC)).timestamp()
+    due = []
+    while self._pending and self._pending[0][0] <= now:
+      due.append(heapq.heappop(self._pending))
+
+    for _, _, ven_id, kw, start, end in due:
+      self.server.add_event(
+        ven_id=ven_id,
+        signal_name='LOAD_DISPATCH',
+        signal_type='delta',
+        intervals=[Interval(dtstart=start, duration=end - start, signal_payload=-kw)],
+        callback=self.callback,
+      )
+    if due:
+      logger.info(f'Dispatched {len(due)} scheduled events.')
+    return len(due)
+
+  async def run(self, interval: float = 1.0):
+    """
+    Dispatches due assignments every `interval` seconds, forever.
+    """
+    while True:
+      self.dispatch_due()
+      await asyncio.sleep(interval)
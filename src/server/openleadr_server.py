@@ -1,19 +1,35 @@
+import asyncio
+import contextvars
 import logging
-from datetime import datetime, timedelta, timezone
-from functools import partial
-from typing import Union, Tuple
+from datetime import UTC, datetime, timedelta
+from http import HTTPStatus
 
-from openleadr import OpenADRServer, enable_default_logging
+from aiohttp import web
+from openleadr import OpenADRServer, enable_default_logging, errors
 from openleadr.objects import Interval
 from openleadr.utils import generate_id
 
+from ..diagnostics import Diagnostics, create_diagnostics
 from ..openleadr_node.config.config import Config
-from ..sqlite.sqlite import Database
+from ..storage import create_storage
+from .admission import AdmissionController
+from .event_scheduler import EventScheduler
+from .query_api import QueryService
+from .registration_writer import RegistrationWriter
+from .report_stats import ReportStatistics
+from .sampling_governor import SamplingGovernor
+from .sampling_policy import SamplingPolicy
+from .scheduler_api import SchedulerService
+from .stream_registry import StreamRegistry
 
 # Setup logging
 enable_default_logging()
 logger = logging.getLogger(__name__)
 
+EVENT_DURATION = timedelta(minutes=10)
+# The OpenADR service of the request being handled, e.g. 'OadrPoll'.
+REQUEST_SERVICE = contextvars.ContextVar('request_service', default=None)
+
 
 class OpenLeADRServer:
   """
@@ -23,13 +39,46 @@ class OpenLeADRServer:
   ----------
   server : OpenADRServer
       The OpenADR server instance.
-  db_conn : Database
-      The database connection instance.
+  db_conn : StorageInterface
+      The storage backend selected by the config.
+  report_stats : ReportStatistics
+      Running statistics of every report stream, used by the event rules.
+  scheduler : EventScheduler
+      Turns fleet-level shed targets into per-VEN events.
+  admin_app : aiohttp.web.Application
+      The admin HTTP site, served on `config.admin_host` and `config.admin_port`
+      apart from the OpenADR port. Serves the `SchedulerService` and
+      diagnostics routes.
+  stream_registry : StreamRegistry
+      The persisted index of report streams and the report requests bound to
+      them, routing reports to `on_stream_report`.
+  sampling_policy : SamplingPolicy
+      Negotiates the sampling interval of new report streams.
+  ingest_queue : asyncio.Queue
+      Report data waiting to be stored, as (stream_id, data) tuples.
+  governor : SamplingGovernor
+      Tracks the ingest queue depth and event-loop lag and downgrades streams
+      under overload.
+  query_service : QueryService
+      Serves /vens/{ven_id}/values on the HTTP server of the VTN.
+  admission : AdmissionController
+      Rejects registrations with a retryable 503 when over capacity.
+  registration_writer : RegistrationWriter
+      Commits registration writes in micro-batches.
+  diagnostics : Diagnostics
+      Times the handlers, storage writes and HTTP requests and serves
+      /diagnostics on the admin site, None if disabled.
   loop : asyncio.AbstractEventLoop
       The asyncio event loop.
   """
 
-  def __init__(self, server_name: str, db_name: str, config: Config):
+  def __init__(
+    self,
+    server_name: str,
+    db_name: str,
+    config: Config,
+    diagnostics: Diagnostics = None,
+  ):
     """
     Initializes the OpenLeADRServer with the provided server name and database name.
 
@@ -38,50 +87,286 @@ class OpenLeADRServer:
     server_name : str
         The name of the server.
     db_name : str
-        The name of the SQLite database file.
+        The name of the SQLite database file, or the path/name used by the
+        configured storage backend.
+    config : Config
+        The shared node configuration.
+    diagnostics : Diagnostics, optional
+        The diagnostics shared with other roles of the node, created from the
+        config if not given.
     """
-    self.server = OpenADRServer(vtn_id=server_name)
+    self.config = config
+    self.db_conn = create_storage(config.get_storage_backend(), db_name)
+    self.diagnostics = diagnostics or create_diagnostics(config)
+    if self.diagnostics is not None:
+      self.time_handlers()
+
+    self.server = OpenADRServer(vtn_id=server_name, ven_lookup=self.ven_lookup)
     self.server.add_handler(
       'on_create_party_registration', self.on_create_party_registration
     )
     self.server.add_handler('on_register_report', self.on_register_report)
+    self.report_stats = ReportStatistics(ewma_alpha=config.stats_ewma_alpha)
+    self.sampling_policy = SamplingPolicy(
+      config.sampling_policy, config.sampling_stream_capacity
+    )
+    self.stream_registry = StreamRegistry(self.db_conn, self.on_stream_report)
+    self.stream_registry.load()
+    # openleadr only keeps report callbacks in memory. Bind report requests in the
+    # persisted registry instead, so reports registered before a restart still
+    # reach their stream through on_update_report.
+    self.server.services[
+      'report_service'
+    ].report_callbacks = self.stream_registry.bindings()
+    self.server.add_handler('on_update_report', self.on_update_report)
+    self.unbound_report_requests = set()
+    self.ingest_queue = asyncio.Queue()
+    self.governor = SamplingGovernor(
+      self.ingest_queue,
+      max_queue_depth=config.max_ingest_queue,
+      max_loop_lag=config.max_loop_lag,
+      overload_threshold=config.overload_threshold,
+    )
+    # Streams registered before a restart can still be downgraded.
+    for stream_id in range(len(self.stream_registry)):
+      ven_id, resource_id, measurement = self.stream_registry.key(stream_id)
+      self.report_stats.add_stream(stream_id, ven_id, resource_id, measurement)
+      interval = self.stream_registry.sampling_interval(stream_id)
+      if interval is not None:
+        self.governor.track(
+          stream_id,
+          ven_id,
+          interval,
+          self.stream_registry.max_sampling_interval(stream_id),
+        )
+    # Registered VENs by ven_id, so that ven_lookup does not hit the storage for
+    # every incoming message.
+    self.ven_registrations = {}
+    self.query_service = QueryService(self.db_conn)
+    self.query_service.setup(self.server.app)
+    # Operator routes are served apart from the OpenADR port, see run.
+    self.admin_app = web.Application()
+    if self.diagnostics is not None:
+      self.diagnostics.setup(self.server.app, self.admin_app)
+    self.admission = AdmissionController(
+      config.registration_rate,
+      config.registration_burst,
+      config.registration_concurrency,
+    )
+    self.server.app.middlewares.append(self.add_retry_after)
+    self.server.app.middlewares.append(self.track_service)
+    self.registration_writer = RegistrationWriter(
+      self.db_conn, max_delay=config.registration_batch_delay
+    )
+    # The VEN roster by name, so that registrations do not read the storage.
+    self.vens_by_name = {row[1]: row for row in self.db_conn.fetch_vens()}
+    # Until when the last event issued to a VEN is active, used to avoid issuing a
+    # new event for every report that matches a rule.
+    self.event_active_until = {}
+    self.scheduler = EventScheduler(
+      self.server,
+      self.report_stats,
+      measurement=config.dispatch_measurement,
+      max_age=config.dispatch_max_age,
+      callback=self.event_callback,
+    )
+    SchedulerService(self.scheduler).setup(self.admin_app)
 
-    self.db_conn = Database(db_name)
-    self.config = config
+  async def run(self):
+    """
+    Starts the OpenADR server, the admin site and the event scheduler in the
+    running loop.
+    """
+    self.admin_runner = web.AppRunner(self.admin_app)
+    await self.admin_runner.setup()
+    await web.TCPSite(
+      self.admin_runner, self.config.admin_host, self.config.admin_port
+    ).start()
+    self.scheduler_task = asyncio.create_task(self.scheduler.run())
+    self.ingest_task = asyncio.create_task(self.run_ingest())
+    self.governor_task = asyncio.create_task(self.governor.run())
+    if self.diagnostics is not None:
+      self.diagnostics.start()
+    await self.server.run()
+
+  def time_handlers(self):
+    """
+    Replaces the handlers and storage writes with wrappers recording their timings
+    in the diagnostics, before they are passed to openleadr.
+    """
+    wrap = self.diagnostics.wrap
+    self.ven_lookup = wrap('vtn.ven_lookup', self.ven_lookup)
+    self.on_create_party_registration = wrap(
+      'vtn.on_create_party_registration',
+      self.on_create_party_registration,
+      lambda registration_info: {'ven_name': registration_info.get('ven_name')},
+    )
+    self.on_register_report = wrap('vtn.on_register_report', self.on_register_report)
+    self.on_update_report = wrap(
+      'vtn.on_update_report',
+      self.on_update_report,
+      lambda report: {
+        'report_request_id': report.get('report_request_id'),
+        'intervals': len(report.get('intervals') or ()),
+      },
+    )
+    self.on_stream_report = wrap('vtn.on_stream_report', self.on_stream_report)
+    self.ingest = wrap(
+      'vtn.ingest',
+      self.ingest,
+      lambda batch: {
+        'reports': len(batch),
+        'values': sum(len(data) for _, data in batch),
+      },
+    )
+    for name in ('store_many_values', 'update_vens', 'fetch_values_page'):
+      setattr(self.db_conn, name, wrap(f'storage.{name}', getattr(self.db_conn, name)))
+
+  @web.middleware
+  async def add_retry_after(self, request: web.Request, handler):
+    """
+    Tells clients rejected by the admission control when to retry.
+
+    openleadr turns errors.HTTPError into a plain response, so the Retry-After
+    header is added here.
+    """
+    response = await handler(request)
+    if response.status == HTTPStatus.SERVICE_UNAVAILABLE:
+      response.headers['Retry-After'] = str(self.admission.retry_after())
+    return response
+
+  @web.middleware
+  async def track_service(self, request: web.Request, handler):
+    """
+    Makes the OpenADR service of a request known to `ven_lookup`.
+    """
+    token = REQUEST_SERVICE.set(request.path.rsplit('/', 1)[-1])
+    try:
+      return await handler(request)
+    finally:
+      REQUEST_SERVICE.reset(token)
+
+  async def ven_lookup(self, ven_id: str):
+    """
+    Looks up a registered VEN for openleadr.
+
+    Returns None to the next poll of a VEN the sampling governor wants to
+    downgrade, which makes openleadr ask it to re-register. VENs only act on
+    re-registration requests in poll responses.
+
+    Parameters
+    ----------
+    ven_id : str
+        The ID of the VEN.
+
+    Returns
+    -------
+    dict or None
+        The ven_id, ven_name and registration_id of the VEN, or None.
+    """
+    if REQUEST_SERVICE.get() == 'OadrPoll' and self.governor.take_reregistration(
+      ven_id
+    ):
+      return None
+
+    registration = self.ven_registrations.get(ven_id)
+    if registration is None:
+      row = self.db_conn.fetch_ven(ven_id=ven_id)
+      if row is None:
+        return None
+      registration = {'ven_id': row[2], 'ven_name': row[1], 'registration_id': row[3]}
+      self.ven_registrations[ven_id] = registration
+    return registration
 
   async def on_create_party_registration(
     self, registration_info: dict
-  ) -> Union[Tuple[str, str], bool]:
+  ) -> tuple[str, str] | bool:
     """
     Handles the creation of party registrations, assigning VEN IDs and registration IDs as needed.
 
+    Registrations pass the admission control first and their writes are committed in
+    micro-batches by the registration writer. Re-registrations the sampling governor
+    asked for bypass the admission control, as they happen under high load.
+
     Parameters
     ----------
     registration_info : dict
-        Dictionary containing registration information including ven_name.
+        Dictionary containing registration information including ven_name, and the
+        ven_id and registration_id of a VEN that registers again.
 
     Returns
     -------
-    Union[Tuple[str, str], bool]
+    tuple[str, str] | bool
         Returns a tuple (ven_id, registration_id) if the registration was processed successfully.
         Returns False if the VEN already exists or if no VEN name is provided.
+
+    Raises
+    ------
+    openleadr.errors.HTTPError
+        With status 503 if the server is over capacity, the VEN should retry later.
     """
-    ven_name = registration_info.get('ven_name')
-    result = self.db_conn.fetch_ven(ven_name=ven_name)
+    ven_id = registration_info.get('ven_id')
+    requested = ven_id is not None and self.governor.complete_reregistration(ven_id)
+    if not requested and not self.admission.try_acquire():
+      raise errors.HTTPError(
+        HTTPStatus.SERVICE_UNAVAILABLE, 'Too many registrations, please retry later.'
+      )
+    try:
+      return await self.register_ven(registration_info.get('ven_name'), ven_id)
+    finally:
+      if not requested:
+        self.admission.release()
 
-    if result is not None:
-      ven_id = generate_id()
-      registration_id = generate_id()
+  async def register_ven(
+    self, ven_name: str, ven_id: str | None = None
+  ) -> tuple[str, str] | bool:
+    """
+    Assigns a VEN ID and registration ID to a provisioned VEN.
 
-      self.db_conn.update_ven(ven_name, ven_id, registration_id)
-      self.config.set_ven_id(ven_id)
-      logger.info(f'Registered new VEN: {ven_name} with ID: {ven_id}')
+    A VEN that registers again with the ven_id it was given keeps its IDs, so its
+    report streams, statistics, groups and meter history stay under one ven_id.
 
-      return ven_id, registration_id
-    else:
+    Parameters
+    ----------
+    ven_name : str
+        The name of the VEN.
+    ven_id : str, optional
+        The ven_id the VEN registered with before.
+
+    Returns
+    -------
+    tuple[str, str] | bool
+        A tuple (ven_id, registration_id), or False if the VEN is not provisioned.
+    """
+    result = self.vens_by_name.get(ven_name)
+    if result is None and ven_name is not None:
+      # Fall back to the storage for VENs provisioned while the server runs.
+      result = self.db_conn.fetch_ven(ven_name=ven_name)
+      if result is not None:
+        self.vens_by_name[ven_name] = result
+
+    if result is None:
       logger.info(f'VEN {ven_name} already exists.')
       return False
 
+    if ven_id is not None and ven_id == result[2] and result[3] is not None:
+      registration_id = result[3]
+      logger.info(f'Registered VEN {ven_name} again with ID: {ven_id}')
+    else:
+      ven_id = generate_id()
+      registration_id = generate_id()
+      await self.registration_writer.update_ven(ven_name, ven_id, registration_id)
+      self.vens_by_name[ven_name] = (result[0], ven_name, ven_id, registration_id)
+      logger.info(f'Registered new VEN: {ven_name} with ID: {ven_id}')
+
+    self.ven_registrations[ven_id] = {
+      'ven_id': ven_id,
+      'ven_name': ven_name,
+      'registration_id': registration_id,
+    }
+    self.config.set_ven_id(ven_id)
+    return ven_id, registration_id
+
   async def on_register_report(
     self,
     ven_id: str,
@@ -95,6 +380,10 @@ class OpenLeADRServer:
     """
     Handles report registrations from VENs and provides a callback and sampling interval.
 
+    The stream is added to the stream registry, whose callback routes its reports to
+    `on_stream_report`. The sampling interval is chosen by the sampling policy from
+    the number of streams or the current load of the server, whichever is higher.
+
     Parameters
     ----------
     ven_id : str
@@ -117,57 +406,180 @@ class OpenLeADRServer:
     tuple
         A tuple containing the callback function and the sampling interval.
     """
-    callback = partial(
-      self.on_update_report,
-      ven_id=ven_id,
-      resource_id=resource_id,
-      measurement=measurement,
+    sampling_interval = self.sampling_policy.choose(
+      min_sampling_interval,
+      max_sampling_interval,
+      max(self.sampling_policy.load_of(len(self.stream_registry)), self.governor.load),
+    )
+    stream_id = self.stream_registry.register(
+      ven_id,
+      resource_id,
+      measurement,
+      unit,
+      scale,
+      sampling_interval,
+      max_sampling_interval,
     )
+    self.report_stats.add_stream(stream_id, ven_id, resource_id, measurement)
+    self.governor.track(stream_id, ven_id, sampling_interval, max_sampling_interval)
 
-    sampling_interval = min_sampling_interval
-    return callback, sampling_interval
+    return self.stream_registry.callback(stream_id), sampling_interval
 
   async def store_voltage(self, data):
     pass
 
-  async def on_update_report(
-    self, data: list, ven_id: str, resource_id: str, measurement: str
-  ):
+  async def on_update_report(self, report: dict):
     """
-    Handles and logs report data received from VENs.
+    Routes the data of a report to the streams its report request is bound to.
+
+    openleadr hands every report to this handler, because the registry's report
+    bindings replace its in-memory callbacks. Data of report requests that are
+    not bound to a stream is dropped with a warning, once per report request.
 
     Parameters
     ----------
+    report : dict
+        The oadrReport, with report_request_id and intervals.
+    """
+    report_request_id = report['report_request_id']
+    data_by_stream = {}
+    for interval in report.get('intervals') or ():
+      payload = interval['report_payload']
+      stream_id = self.stream_registry.route(report_request_id, payload['r_id'])
+      if stream_id is None:
+        if report_request_id not in self.unbound_report_requests:
+          self.unbound_report_requests.add(report_request_id)
+          logger.warning(
+            f'Dropping report data of unknown report request {report_request_id}.'
+          )
+        continue
+      data_by_stream.setdefault(stream_id, []).append(
+        (interval['dtstart'], payload['value'])
+      )
+
+    for stream_id, data in data_by_stream.items():
+      await self.on_stream_report(stream_id, data)
+
+  async def on_stream_report(self, stream_id: int, data: list):
+    """
+    The shared handler for report data of all registered streams.
+
+    Queues the data for `run_ingest`, so the request returns without waiting
+    for the storage.
+
+    Parameters
+    ----------
+    stream_id : int
+        The id of the stream in the stream registry.
     data : list
         A list of tuples containing (time, value) pairs.
+    """
+    self.ingest_queue.put_nowait((stream_id, data))
+
+  async def run_ingest(self, batch_size: int = 1000):
+    """
+    Stores queued report data in batches of up to `batch_size` reports, forever.
+    """
+    while True:
+      batch = [await self.ingest_queue.get()]
+      while len(batch) < batch_size and not self.ingest_queue.empty():
+        batch.append(self.ingest_queue.get_nowait())
+
+      try:
+        self.ingest(batch)
+      except Exception:
+        logger.exception(f'Failed to ingest {len(batch)} reports.')
+      finally:
+        for _ in batch:
+          self.ingest_queue.task_done()
+      # Let the request handlers run between two batches.
+      await asyncio.sleep(0)
+
+  def ingest(self, batch: list):
+    """
+    Stores report data, updates the report statistics and applies the event rules.
+
+    Parameters
+    ----------
+    batch : list
+        (stream_id, data) tuples, data being a list of (time, value) pairs.
+    """
+    rows = []
+    for stream_id, data in batch:
+      ven_id = self.report_stats.key(stream_id)[0]
+      rows.extend((ven_id, time, value) for time, value in data)
+    self.db_conn.store_many_values(rows)
+
+    for stream_id, data in batch:
+      ven_id, resource_id, measurement = self.report_stats.key(stream_id)
+      # The threshold is a level of one measurement, e.g. a voltage.
+      thresholded = measurement == self.config.event_threshold_measurement
+      for time, value in data:
+        logger.debug(
+          f'VEN {ven_id} reported {measurement} = {value} at {time} for resource {resource_id}'
+        )
+
+        anomalous = self.is_anomalous(stream_id, value)
+        self.report_stats.update(stream_id, time, value)
+
+        if anomalous or (
+          thresholded
+          and self.report_stats.ewma(stream_id) < self.config.event_threshold
+        ):
+          self.issue_event(ven_id)
+
+  def is_anomalous(self, stream_id: int, value: float, min_count: int = 10) -> bool:
+    """
+    Checks whether a value deviates too far from the history of its stream.
+
+    Parameters
+    ----------
+    stream_id : int
+        The id of the stream in `report_stats`.
+    value : float
+        The reported value, checked before it is added to the statistics.
+    min_count : int
+        The number of values a stream needs before it can be anomalous.
+
+    Returns
+    -------
+    bool
+        True if the z-score of the value exceeds the configured limit.
+    """
+    if self.report_stats.count(stream_id) < min_count:
+      return False
+    return abs(self.report_stats.zscore(stream_id, value)) > self.config.anomaly_zscore
+
+  def issue_event(self, ven_id: str, duration: timedelta = EVENT_DURATION):
+    """
+    Issues a simple level event to a VEN, unless its previous event is still active.
+
+    Parameters
+    ----------
     ven_id : str
         The ID of the VEN.
-    resource_id : str
-        The ID of the resource.
-    measurement : str
-        The type of measurement.
+    duration : timedelta
+        The duration of the event.
     """
-    for time, value in data:
-      print(
-        f'VEN {ven_id} reported {measurement} = {value} at {time} for resource {resource_id}'
-      )
+    now = datetime.now(tz=UTC)
+    active_until = self.event_active_until.get(ven_id)
+    if active_until is not None and active_until > now:
+      return
 
-      self.db_conn.store_values(ven_id, time, value)
-
-      if value < 200:
-        self.server.add_event(
-          ven_id=ven_id,
-          signal_name='simple',
-          signal_type='level',
-          intervals=[
-            Interval(
-              dtstart=datetime.now(tz=timezone.utc),
-              duration=timedelta(minutes=10),
-              signal_payload=1,
-            ),
-          ],
-          callback=self.event_callback,
-        )
+    self.event_active_until[ven_id] = now + duration
+    self.server.add_event(
+      ven_id=ven_id,
+      signal_name='simple',
+      signal_type='level',
+      intervals=[
+        Interval(
+          dtstart=now,
+          duration=duration,
+          signal_payload=1,
+        ),
+      ],
+      callback=self.event_callback,
+    )
 
   async def event_callback(self, ven_id: str, event_id: str, opt_type: str):
     print(f'The VEN decided to {opt_type}')
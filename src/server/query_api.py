@@ -0,0 +1,208 @@
+import asyncio
+import base64
+import binascii
+import functools
+import json
+import math
+import struct
+from datetime import UTC, datetime
+
+from aiohttp import web
+
+from ..storage import StorageInterface
+from ..storage.storage_interface import to_timestamp
+
+DATA_FRAME_MAGIC = b'MVF1'
+END_FRAME_MAGIC = b'MVFE'
+FRAME_HEADER = struct.Struct('<4sI')
+FORMATS = {'ndjson': 'application/x-ndjson', 'columnar': 'application/octet-stream'}
+
+
+class QueryService:
+  """
+  Serves time-range queries for meter values as streaming HTTP responses.
+
+  GET /vens/{ven_id}/values takes the query parameters
+    from, to    ISO 8601 time range, inclusive/exclusive, both optional.
+    resolution  Average values per bucket of this many seconds, optional.
+    limit       Maximum number of rows in the response.
+    cursor      The `next_cursor` of the previous response.
+    format      'ndjson' (default) or 'columnar'.
+
+  NDJSON responses hold one {"time": ..., "value": ...} object per line and end
+  with a {"next_cursor": ...} line, null on the last page.
+
+  Columnar responses are a sequence of little-endian frames. A data frame is the
+  magic b'MVF1', the row count n as uint32, n float64 POSIX timestamps and n
+  float64 values. The last frame is the magic b'MVFE', a uint32 length and that
+  many bytes of UTF-8 JSON holding {"next_cursor": ...}.
+
+  Rows are read from the storage backend page by page and written as they come,
+  so a response never holds more than one chunk in memory. The storage calls
+  run in the default executor, so a slow page does not block the event loop.
+
+  The route has no access control: anyone who can reach the HTTP port of the VTN
+  can read the meter values of every VEN. Keep the port behind a firewall or an
+  authenticating reverse proxy when it is exposed.
+
+  Attributes
+  ----------
+  storage : StorageInterface
+      The storage backend the values are read from.
+  chunk_size : int
+      The number of rows read from storage and written per chunk.
+  default_limit : int
+      The number of rows per response if the request sets no limit.
+  max_limit : int
+      The largest limit a request may set.
+  """
+
+  def __init__(
+    self,
+    storage: StorageInterface,
+    chunk_size: int = 1000,
+    default_limit: int = 10_000,
+    max_limit: int = 100_000,
+  ):
+    self.storage = storage
+    self.chunk_size = chunk_size
+    self.default_limit = default_limit
+    self.max_limit = max_limit
+
+  def setup(self, app: web.Application):
+    """
+    Adds the query routes to an aiohttp application that is not running yet.
+    """
+    app.add_routes([web.get('/vens/{ven_id}/values', self.get_values)])
+
+  async def get_values(self, request: web.Request) -> web.StreamResponse:
+    """
+    Streams one page of the meter values of a VEN.
+
+    Raises
+    ------
+    aiohttp.web.HTTPBadRequest
+        If a query parameter is invalid, checked before the response starts.
+    """
+    ven_id = request.match_info['ven_id']
+    query = request.query
+    start = _parse_time(query.get('from'), 'from')
+    end = _parse_time(query.get('to'), 'to')
+    resolution = _parse_int(query.get('resolution'), 'resolution', None)
+    limit = min(
+      _parse_int(query.get('limit'), 'limit', self.default_limit), self.max_limit
+    )
+    cursor = _decode_cursor(query.get('cursor'))
+    try:
+      self.storage.validate_cursor(cursor, resolution)
+    except ValueError:
+      raise web.HTTPBadRequest(text='cursor is invalid.') from None
+    output_format = query.get('format', 'ndjson')
+    if output_format not in FORMATS:
+      raise web.HTTPBadRequest(text=f'format must be one of {", ".join(FORMATS)}.')
+
+    response = web.StreamResponse(headers={'Content-Type': FORMATS[output_format]})
+    response.enable_chunked_encoding()
+    await response.prepare(request)
+
+    encode = _encode_ndjson if output_format == 'ndjson' else _encode_columnar
+    loop = asyncio.get_running_loop()
+    remaining = limit
+    while remaining > 0:
+      rows, cursor = await loop.run_in_executor(
+        None,
+        functools.partial(
+          self.storage.fetch_values_page,
+          ven_id,
+          start,
+          end,
+          cursor,
+          min(self.chunk_size, remaining),
+          resolution,
+        ),
+      )
+      if rows:
+        await response.write(encode(rows))
+      remaining -= len(rows)
+      if cursor is None or not rows:
+        cursor = None
+        break
+
+    trailer = json.dumps({'next_cursor': _encode_cursor(cursor)})
+    if output_format == 'ndjson':
+      await response.write(trailer.encode() + b'\n')
+    else:
+      trailer = trailer.encode()
+      await response.write(FRAME_HEADER.pack(END_FRAME_MAGIC, len(trailer)) + trailer)
+    await response.write_eof()
+    return response
+
+
+def _parse_time(value, name):
+  if value is None:
+    return None
+  try:
+    time = datetime.fromisoformat(value)
+  except ValueError:
+    raise web.HTTPBadRequest(text=f'{name} must be an ISO 8601 time.') from None
+  # Stored times are UTC, so compare against UTC as well.
+  if time.tzinfo is None:
+    return time.replace(tzinfo=UTC)
+  return time.astimezone(UTC)
+
+
+def _parse_int(value, name, default):
+  if value is None:
+    return default
+  try:
+    number = int(value)
+  except ValueError:
+    number = 0
+  if number <= 0:
+    raise web.HTTPBadRequest(text=f'{name} must be a positive integer.')
+  return number
+
+
+def _encode_cursor(cursor):
+  if cursor is None:
+    return None
+  return base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+
+
+def _decode_cursor(value):
+  if value is None:
+    return None
+  try:
+    return json.loads(base64.urlsafe_b64decode(value.encode()))
+  except (binascii.Error, ValueError):
+    raise web.HTTPBadRequest(text='cursor is invalid.') from None
+
+
+def _format_time(time):
+  return time.isoformat() if isinstance(time, datetime) else str(time)
+
+
+def _to_float(value):
+  try:
+    return float(value)
+  except (TypeError, ValueError):
+    return math.nan
+
+
+def _encode_ndjson(rows) -> bytes:
+  lines = []
+  for time, value in rows:
+    value = _to_float(value)
+    lines.append(
+      json.dumps(
+        {'time': _format_time(time), 'value': None if math.isnan(value) else value}
+      )
+    )
+  return ('\n'.join(lines) + '\n').encode()
+
+
+def _encode_columnar(rows) -> bytes:
+  count = len(rows)
+  times = struct.pack(f'<{count}d', *(to_timestamp(time) for time, _ in rows))
+  values = struct.pack(f'<{count}d', *(_to_float(value) for _, value in rows))
+  return FRAME_HEADER.pack(DATA_FRAME_MAGIC, count) + times + values
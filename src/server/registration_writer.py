@@ -0,0 +1,78 @@
+import asyncio
+import logging
+
+from ..storage import StorageInterface
+
+logger = logging.getLogger(__name__)
+
+
+class RegistrationWriter:
+  """
+  Groups VEN registration writes into micro-batched commits.
+
+  Each `update_ven` call waits until its row is committed, but rows arriving
+  within `max_delay` seconds of each other share one `update_vens` transaction,
+  up to `max_batch` rows. A registration storm therefore costs one commit per
+  batch instead of one per VEN.
+
+  Attributes
+  ----------
+  storage : StorageInterface
+      The storage backend the VENs are written to.
+  max_batch : int
+      The number of rows that triggers an immediate commit.
+  max_delay : float
+      The longest time in seconds a row waits for more rows to join its batch.
+  """
+
+  def __init__(
+    self, storage: StorageInterface, max_batch: int = 500, max_delay: float = 0.02
+  ):
+    self.storage = storage
+    self.max_batch = max_batch
+    self.max_delay = max_delay
+    self._pending = []
+    self._timer = None
+
+  async def update_ven(self, ven_name: str, ven_id: str, registration_id: str):
+    """
+    Queues a VEN update and waits until the batch containing it is committed.
+
+    Raises
+    ------
+    Exception
+        Whatever the storage backend raised while committing the batch.
+    """
+    future = asyncio.get_running_loop().create_future()
+    self._pending.append(((ven_name, ven_id, registration_id), future))
+
+    if len(self._pending) >= self.max_batch:
+      self.flush()
+    elif self._timer is None:
+      self._timer = asyncio.get_running_loop().call_later(self.max_delay, self.flush)
+
+    await future
+
+  def flush(self):
+    """
+    Commits all queued rows in one transaction and wakes up their writers.
+    """
+    if self._timer is not None:
+      self._timer.cancel()
+      self._timer = None
+    batch, self._pending = self._pending, []
+    if not batch:
+      return
+
+    try:
+      self.storage.update_vens([row for row, _ in batch])
+    except Exception as err:
+      logger.exception(f'Failed to commit {len(batch)} VEN registrations.')
+      for _, future in batch:
+        if not future.done():
+          future.set_exception(err)
+      return
+
+    for _, future in batch:
+      if not future.done():
+        future.set_result(None)
@@ -0,0 +1,227 @@
+import math
+from array import array
+from datetime import UTC, datetime
+
+# Per-stream statistics, one array slot per stream id.
+_FIELDS = (
+  'mean',
+  'm2',
+  'ewma',
+  'min',
+  'max',
+  'last_value',
+  'last_seen',
+  'interval_mean',
+  'interval_m2',
+)
+
+
+class ReportStatistics:
+  """
+  Running statistics for every report stream, updated in O(1) per value.
+
+  A stream is a (ven_id, resource_id, measurement) triple with a compact integer
+  id. Every statistic lives in its own `array.array` indexed by the stream id, so
+  the statistics of 100k streams take about 8 MB and allocate no per-stream
+  objects. The index from keys to ids does hold a tuple and dict entry per
+  stream, which brings 100k streams to about 40 MB in total.
+
+  Per stream the engine keeps Welford's mean and variance, an EWMA, min/max, the
+  last value and when it was seen, and Welford's mean and variance of the
+  intervals between reports (the jitter is their standard deviation).
+
+  Attributes
+  ----------
+  ewma_alpha : float
+      The smoothing factor of the EWMA, between 0 and 1.
+  """
+
+  def __init__(self, ewma_alpha: float = 0.1):
+    self.ewma_alpha = ewma_alpha
+    self._stream_ids = {}
+    self._keys = []
+    self._ven_streams = {}
+    self._count = array('q')
+    for field in _FIELDS:
+      setattr(self, f'_{field}', array('d'))
+
+  def __len__(self):
+    return len(self._keys)
+
+  def stream_id(self, ven_id: str, resource_id: str, measurement: str) -> int:
+    """
+    Returns the id of a stream, allocating it on first use.
+
+    Returns
+    -------
+    int
+        The compact stream id.
+    """
+    key = (ven_id, resource_id, measurement)
+    stream_id = self._stream_ids.get(key)
+    if stream_id is None:
+      stream_id = self._allocate(key)
+    return stream_id
+
+  def add_stream(
+    self, stream_id: int, ven_id: str, resource_id: str, measurement: str
+  ) -> int:
+    """
+    Adds a stream under an id allocated elsewhere, such as the stream registry.
+
+    Ids must be handed out densely, in order, starting at 0.
+
+    Raises
+    ------
+    ValueError
+        If the id would leave a gap or belongs to a different stream.
+    """
+    key = (ven_id, resource_id, measurement)
+    if stream_id == len(self._keys):
+      return self._allocate(key)
+    if stream_id < len(self._keys) and self._keys[stream_id] == key:
+      return stream_id
+    raise ValueError(f'Stream id {stream_id} does not match the statistics of {key}.')
+
+  def _allocate(self, key: tuple) -> int:
+    stream_id = len(self._keys)
+    self._stream_ids[key] = stream_id
+    self._keys.append(key)
+    self._ven_streams.setdefault(key[0], []).append(stream_id)
+
+    self._count.append(0)
+    for field in ('mean', 'm2', 'ewma', 'interval_mean', 'interval_m2'):
+      getattr(self, f'_{field}').append(0.0)
+    self._min.append(math.inf)
+    self._max.append(-math.inf)
+    self._last_value.append(math.nan)
+    self._last_seen.append(math.nan)
+    return stream_id
+
+  def update(self, stream_id: int, time, value: float):
+    """
+    Feeds a reported value into the statistics of a stream.
+
+    Parameters
+    ----------
+    stream_id : int
+        The id returned by `stream_id`.
+    time : datetime or float
+        When the value was measured, as datetime or POSIX timestamp.
+    value : float
+        The reported value.
+    """
+    timestamp = time.timestamp() if isinstance(time, datetime) else float(time)
+    value = float(value)
+
+    count = self._count[stream_id] + 1
+    self._count[stream_id] = count
+
+    delta = value - self._mean[stream_id]
+    self._mean[stream_id] += delta / count
+    self._m2[stream_id] += delta * (value - self._mean[stream_id])
+
+    if count == 1:
+      self._ewma[stream_id] = value
+    else:
+      self._ewma[stream_id] += self.ewma_alpha * (value - self._ewma[stream_id])
+
+      interval = timestamp - self._last_seen[stream_id]
+      interval_delta = interval - self._interval_mean[stream_id]
+      self._interval_mean[stream_id] += interval_delta / (count - 1)
+      self._interval_m2[stream_id] += interval_delta * (
+        interval - self._interval_mean[stream_id]
+      )
+
+    self._min[stream_id] = min(self._min[stream_id], value)
+    self._max[stream_id] = max(self._max[stream_id], value)
+    self._last_value[stream_id] = value
+    self._last_seen[stream_id] = timestamp
+
+  def key(self, stream_id: int) -> tuple:
+    """Returns the (ven_id, resource_id, measurement) triple of a stream."""
+    return self._keys[stream_id]
+
+  def ven_ids(self) -> list:
+    return list(self._ven_streams)
+
+  def ven_stream_ids(self, ven_id: str) -> list:
+    return self._ven_streams.get(ven_id, [])
+
+  def last_value(self, stream_id: int) -> float:
+    """Returns the last reported value of a stream, NaN if it never reported."""
+    return self._last_value[stream_id]
+
+  def count(self, stream_id: int) -> int:
+    return self._count[stream_id]
+
+  def ewma(self, stream_id: int) -> float:
+    return self._ewma[stream_id]
+
+  def stddev(self, stream_id: int) -> float:
+    count = self._count[stream_id]
+    return math.sqrt(self._m2[stream_id] / (count - 1)) if count > 1 else 0.0
+
+  def zscore(self, stream_id: int, value: float) -> float:
+    """
+    Returns how many standard deviations a value is away from the stream mean.
+
+    Returns 0.0 while the stream has no variance yet.
+    """
+    stddev = self.stddev(stream_id)
+    return (float(value) - self._mean[stream_id]) / stddev if stddev > 0 else 0.0
+
+  def snapshot(self, stream_id: int) -> dict:
+    """
+    Returns the current statistics of a stream.
+
+    Returns
+    -------
+    dict
+        The stream key and its statistics.
+    """
+    ven_id, resource_id, measurement = self._keys[stream_id]
+    count = self._count[stream_id]
+    last_seen = self._last_seen[stream_id]
+    interval_variance = self._interval_m2[stream_id] / (count - 2) if count > 2 else 0.0
+    return {
+      'stream_id': stream_id,
+      'ven_id': ven_id,
+      'resource_id': resource_id,
+      'measurement': measurement,
+      'count': count,
+      'mean': self._mean[stream_id] if count else None,
+      'stddev': self.stddev(stream_id),
+      'ewma': self._ewma[stream_id] if count else None,
+      'min': self._min[stream_id] if count else None,
+      'max': self._max[stream_id] if count else None,
+      'last_value': self._last_value[stream_id] if count else None,
+      'last_seen': (datetime.fromtimestamp(last_seen, tz=UTC) if count else None),
+      'interval_mean': self._interval_mean[stream_id] if count > 1 else None,
+      'jitter': math.sqrt(interval_variance),
+    }
+
+  def snapshot_ven(self, ven_id: str) -> list:
+    """
+    Returns the statistics of all streams of a VEN.
+
+    Returns
+    -------
+    list of dict
+        One snapshot per stream, see `snapshot`.
+    """
+    return [self.snapshot(stream_id) for stream_id in self._ven_streams.get(ven_id, [])]
+
+  def stale_streams(self, max_age: float, now: datetime | None = None) -> list:
+    """
+    Returns the ids of streams that have not reported for `max_age` seconds.
+
+    Streams that never reported are not included.
+    """
+    now = (now or datetime.now(tz=UTC)).timestamp()
+    threshold = now - max_age
+    return [
+      stream_id
+      for stream_id, last_seen in enumerate(self._last_seen)
+      if last_seen < threshold
+    ]
@@ -0,0 +1,169 @@
+import asyncio
+import heapq
+import logging
+import time
+from datetime import timedelta
+
+logger = logging.getLogger(__name__)
+
+
+class SamplingGovernor:
+  """
+  Tracks the load of the VTN and slows report streams down when it is saturated.
+
+  The load is the larger of the ingest queue depth and the event-loop lag, each
+  relative to its configured limit, so 1.0 means one of them hit its limit. New
+  report registrations use it to pick a longer sampling interval. When the load
+  stays above `overload_threshold`, the fastest streams that can still go
+  slower are downgraded: their VENs are asked to re-register on their next
+  poll, which re-negotiates all their reports at the current load. The VENs
+  keep their ven_id, so the re-negotiated reports update their existing streams.
+
+  Attributes
+  ----------
+  queue : asyncio.Queue
+      The ingest queue whose depth is monitored.
+  max_queue_depth : int
+      The queue depth that counts as full load.
+  max_loop_lag : float
+      The event-loop lag in seconds that counts as full load.
+  overload_threshold : float
+      The load above which existing streams are downgraded.
+  downgrade_batch : int
+      The maximum number of VENs downgraded per round.
+  downgrade_cooldown : float
+      The seconds to wait after a round before downgrading again.
+  loop_lag : float
+      The smoothed event-loop lag in seconds.
+  """
+
+  def __init__(
+    self,
+    queue: asyncio.Queue,
+    max_queue_depth: int = 10_000,
+    max_loop_lag: float = 0.2,
+    overload_threshold: float = 0.9,
+    downgrade_batch: int = 100,
+    downgrade_cooldown: float = 60.0,
+    lag_alpha: float = 0.3,
+  ):
+    self.queue = queue
+    self.max_queue_depth = max_queue_depth
+    self.max_loop_lag = max_loop_lag
+    self.overload_threshold = overload_threshold
+    self.downgrade_batch = downgrade_batch
+    self.downgrade_cooldown = downgrade_cooldown
+    self.lag_alpha = lag_alpha
+    self.loop_lag = 0.0
+    self._streams = {}
+    self._downgradable = []
+    self._reregister = set()
+    self._reregistering = set()
+    self._last_downgrade = -float('inf')
+
+  @property
+  def load(self) -> float:
+    """The current load between 0 and 1."""
+    queue_load = self.queue.qsize() / self.max_queue_depth
+    lag_load = self.loop_lag / self.max_loop_lag
+    return min(max(queue_load, lag_load), 1.0)
+
+  @property
+  def overloaded(self) -> bool:
+    return self.load >= self.overload_threshold
+
+  def record_lag(self, lag: float):
+    """Feeds a measured event-loop lag in seconds into the smoothed lag."""
+    self.loop_lag += self.lag_alpha * (max(lag, 0.0) - self.loop_lag)
+
+  def track(
+    self, stream_id: int, ven_id: str, interval: timedelta, max_interval: timedelta
+  ):
+    """
+    Records the negotiated interval of a stream and how slow it could go.
+
+    Parameters
+    ----------
+    stream_id : int
+        The id of the stream in the stream registry.
+    ven_id : str
+        The ID of the VEN reporting the stream.
+    interval : timedelta
+        The negotiated sampling interval.
+    max_interval : timedelta
+        The longest interval the VEN offered, may be None.
+    """
+    seconds = interval.total_seconds()
+    self._streams[stream_id] = (ven_id, seconds)
+    if max_interval is not None and seconds < max_interval.total_seconds():
+      heapq.heappush(self._downgradable, (seconds, stream_id))
+
+  def take_reregistration(self, ven_id: str) -> bool:
+    """
+    Returns whether a VEN should be asked to re-register, at most once per downgrade.
+    """
+    if ven_id in self._reregister:
+      self._reregister.discard(ven_id)
+      self._reregistering.add(ven_id)
+      return True
+    return False
+
+  def complete_reregistration(self, ven_id: str) -> bool:
+    """
+    Returns whether a registration of the VEN is one this governor asked for.
+
+    Parameters
+    ----------
+    ven_id : str
+        The ven_id the VEN registers with.
+    """
+    if ven_id in self._reregistering:
+      self._reregistering.discard(ven_id)
+      return True
+    return False
+
+  def downgrade(self, now: float | None = None) -> list:
+    """
+    Marks the VENs of the fastest downgradable streams for re-registration.
+
+    Does nothing while the server is not overloaded or the last round is more
+    recent than `downgrade_cooldown`.
+
+    Returns
+    -------
+    list of str
+        The VENs marked in this round.
+    """
+    now = time.monotonic() if now is None else now
+    if not self.overloaded or now - self._last_downgrade < self.downgrade_cooldown:
+      return []
+
+    marked = []
+    while self._downgradable and len(marked) < self.downgrade_batch:
+      seconds, stream_id = heapq.heappop(self._downgradable)
+      ven_id, current = self._streams.get(stream_id, (None, None))
+      # Skip entries that were re-negotiated since they were pushed.
+      if current != seconds or ven_id in self._reregister:
+        continue
+      self._reregister.add(ven_id)
+      marked.append(ven_id)
+
+    if marked:
+      self._last_downgrade = now
+      logger.warning(
+        f'Load {self.load:.2f}, asking {len(marked)} VENs to re-register'
+        ' with slower sampling intervals.'
+      )
+    return marked
+
+  async def run(self, interval: float = 0.5):
+    """
+    Measures the event-loop lag every `interval` seconds and downgrades streams
+    while the server is overloaded, forever.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+      started = loop.time()
+      await asyncio.sleep(interval)
+      self.record_lag(loop.time() - started - interval)
+      self.downgrade()
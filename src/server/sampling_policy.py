@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+SAMPLING_POLICIES = ('min', 'max', 'load')
+
+
+class SamplingPolicy:
+  """
+  Negotiates the sampling interval of a report stream.
+
+  A VEN offers a range between `min_sampling_interval` and
+  `max_sampling_interval`. The 'min' policy always picks the fastest rate and
+  'max' the slowest. The 'load' policy moves from the minimum towards the
+  maximum as the server load grows from 0 to 1.
+
+  Attributes
+  ----------
+  mode : str
+      One of 'min', 'max' or 'load'.
+  stream_capacity : int
+      The number of report streams at which the server counts as fully loaded.
+  """
+
+  def __init__(self, mode: str = 'load', stream_capacity: int = 10_000):
+    if mode not in SAMPLING_POLICIES:
+      raise ValueError(
+        f'Unknown sampling policy {mode!r}, expected one of {", ".join(SAMPLING_POLICIES)}.'
+      )
+    self.mode = mode
+    self.stream_capacity = stream_capacity
+
+  def load_of(self, active_streams: int) -> float:
+    """
+    Returns the server load implied by the number of active report streams.
+
+    Returns
+    -------
+    float
+        The load between 0 and 1.
+    """
+    return min(active_streams / self.stream_capacity, 1.0)
+
+  def choose(
+    self, min_interval: timedelta, max_interval: timedelta, load: float
+  ) -> timedelta:
+    """
+    Chooses a sampling interval within the range offered by a VEN.
+
+    Parameters
+    ----------
+    min_interval : timedelta
+        The shortest interval the VEN supports.
+    max_interval : timedelta
+        The longest interval the VEN supports, may be None.
+    load : float
+        The current server load between 0 and 1.
+
+    Returns
+    -------
+    timedelta
+        The sampling interval to request.
+    """
+    if max_interval is None or max_interval <= min_interval or self.mode == 'min':
+      return min_interval
+    if self.mode == 'max':
+      return max_interval
+
+    load = min(max(load, 0.0), 1.0)
+    interval = min_interval + (max_interval - min_interval) * load
+    # Whole seconds keep the report requests readable, as long as rounding stays
+    # within the offered range.
+    interval = timedelta(seconds=round(interval.total_seconds()))
+    return min(max(interval, min_interval), max_interval)
@@ -0,0 +1,125 @@
+import math
+from datetime import UTC, datetime
+
+from aiohttp import web
+
+from .event_scheduler import EventScheduler
+
+
+class SchedulerService:
+  """
+  Lets operators define VEN groups and submit shed targets over HTTP.
+
+  The routes are
+    GET /groups                 Returns every group as {group: [ven_id, ...]}.
+    POST /groups/{group}        Takes {"add": [ven_id, ...], "remove": [...]}, both
+                                optional, and returns the members of the group.
+    POST /shed                  Takes {"shed_kw": ..., "start": ..., "end": ...,
+                                "group": ...} with ISO 8601 times and an optional
+                                group, and returns {"assignments": {ven_id: kw}}.
+
+  The routes issue events to VENs, so they belong on the loopback-only admin site
+  of the VTN, never on its public OpenADR port.
+
+  Attributes
+  ----------
+  scheduler : EventScheduler
+      The scheduler the groups and targets are passed to.
+  """
+
+  def __init__(self, scheduler: EventScheduler):
+    self.scheduler = scheduler
+
+  def setup(self, app: web.Application):
+    """
+    Adds the scheduler routes to an aiohttp application that is not running yet.
+    """
+    app.add_routes(
+      [
+        web.get('/groups', self.get_groups),
+        web.post('/groups/{group}', self.post_group),
+        web.post('/shed', self.post_shed),
+      ]
+    )
+
+  async def get_groups(self, request: web.Request) -> web.Response:
+    return web.json_response(
+      {group: sorted(ven_ids) for group, ven_ids in self.scheduler.groups.items()}
+    )
+
+  async def post_group(self, request: web.Request) -> web.Response:
+    """
+    Adds VENs to and removes VENs from a group.
+
+    Raises
+    ------
+    aiohttp.web.HTTPBadRequest
+        If the body is not a JSON object of ven_id lists.
+    """
+    group = request.match_info['group']
+    body = await _read_json(request)
+    add = _parse_ven_ids(body.get('add', []), 'add')
+    remove = _parse_ven_ids(body.get('remove', []), 'remove')
+    self.scheduler.add_to_group(group, *add)
+    self.scheduler.remove_from_group(group, *remove)
+    return web.json_response(
+      {'group': group, 'ven_ids': sorted(self.scheduler.groups.get(group, ()))}
+    )
+
+  async def post_shed(self, request: web.Request) -> web.Response:
+    """
+    Schedules a fleet-level shed target, see `EventScheduler.schedule_shed`.
+
+    Raises
+    ------
+    aiohttp.web.HTTPBadRequest
+        If a field is missing or invalid, or the group is unknown.
+    """
+    body = await _read_json(request)
+    shed_kw = body.get('shed_kw')
+    if (
+      not isinstance(shed_kw, int | float)
+      or isinstance(shed_kw, bool)
+      or not math.isfinite(shed_kw)
+      or shed_kw <= 0
+    ):
+      raise web.HTTPBadRequest(text='shed_kw must be a positive number.')
+    start = _parse_time(body.get('start'), 'start')
+    end = _parse_time(body.get('end'), 'end')
+    group = body.get('group')
+    if group is not None and not isinstance(group, str):
+      raise web.HTTPBadRequest(text='group must be a string.')
+    try:
+      assignments = self.scheduler.schedule_shed(shed_kw, start, end, group)
+    except ValueError as err:
+      raise web.HTTPBadRequest(text=str(err)) from None
+    return web.json_response({'assignments': assignments})
+
+
+async def _read_json(request):
+  try:
+    body = await request.json()
+  except ValueError:
+    raise web.HTTPBadRequest(text='The body must be JSON.') from None
+  if not isinstance(body, dict):
+    raise web.HTTPBadRequest(text='The body must be a JSON object.')
+  return body
+
+
+def _parse_ven_ids(value, name):
+  if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+    raise web.HTTPBadRequest(text=f'{name} must be a list of ven_ids.')
+  return value
+
+
+def _parse_time(value, name):
+  if not isinstance(value, str):
+    raise web.HTTPBadRequest(text=f'{name} must be an ISO 8601 time.')
+  try:
+    time = datetime.fromisoformat(value)
+  except ValueError:
+    raise web.HTTPBadRequest(text=f'{name} must be an ISO 8601 time.') from None
+  # Events are scheduled in UTC, read times without an offset as UTC as well.
+  if time.tzinfo is None:
+    return time.replace(tzinfo=UTC)
+  return time
@@ -0,0 +1,215 @@
+import logging
+from datetime import timedelta
+
+from ..storage import StorageInterface
+
+logger = logging.getLogger(__name__)
+
+
+class StreamCallback:
+  """
+  The report callback handed to openleadr for one stream.
+
+  Calls the shared handler with the stream id, so no per-registration closure
+  or partial is needed. One instance exists per stream and is reused when the
+  stream is registered again.
+  """
+
+  __slots__ = ('handler', 'stream_id')
+
+  def __init__(self, stream_id: int, handler):
+    self.stream_id = stream_id
+    self.handler = handler
+
+  def __call__(self, data: list):
+    return self.handler(self.stream_id, data)
+
+
+class ReportBindings(dict):
+  """
+  Stands in for the report callback table of openleadr's report service.
+
+  openleadr keeps the callback of every registered report in a dict keyed by
+  (report_request_id, r_id) that only lives in memory, so a restarted VTN
+  drops the reports of VENs that registered before. This table persists the
+  stream id of a `StreamCallback` through the registry instead of keeping the
+  callback. It stays empty, which makes openleadr hand every report to the
+  `on_update_report` handler, where `StreamRegistry.route` finds its stream.
+  """
+
+  def __init__(self, registry):
+    super().__init__()
+    self.registry = registry
+
+  def __setitem__(self, key: tuple, callback):
+    # Storing anything would make openleadr skip on_update_report for every
+    # report, so callbacks that are not streams are dropped.
+    if isinstance(callback, StreamCallback):
+      self.registry.bind(*key, callback.stream_id)
+    else:
+      logger.error(
+        f'Dropped report callback {callback!r} for {key}, it is not a stream.'
+      )
+
+
+class StreamRegistry:
+  """
+  An index of the report streams known to the server.
+
+  Every (ven_id, resource_id, measurement) triple gets a compact integer stream
+  id, handed out densely from 0. Streams are persisted through the storage
+  backend and loaded again at startup, so the ids survive a restart of the
+  server. So do the bindings of report requests to streams, which route the
+  reports of VENs that registered before the restart.
+
+  Attributes
+  ----------
+  storage : StorageInterface
+      The storage backend the streams are persisted in.
+  handler : callable
+      The shared handler, called with (stream_id, data) for every report.
+  """
+
+  def __init__(self, storage: StorageInterface, handler):
+    self.storage = storage
+    self.handler = handler
+    self._stream_ids = {}
+    self._keys = []
+    self._rows = []
+    self._callbacks = []
+    self._bindings = {}
+    self._stream_bindings = {}
+
+  def __len__(self):
+    return len(self._keys)
+
+  def load(self) -> int:
+    """
+    Loads the persisted streams and the report requests bound to them.
+
+    Returns
+    -------
+    int
+        The number of streams loaded.
+    """
+    for row in self.storage.fetch_streams():
+      stream_id, ven_id, resource_id, measurement = row[:4]
+      if stream_id != len(self._keys):
+        logger.error(
+          f'Report stream ids are not dense, stopped loading at {stream_id}.'
+        )
+        break
+      self._add((ven_id, resource_id, measurement), row)
+    for report_request_id, r_id, stream_id in self.storage.fetch_report_bindings():
+      if stream_id < len(self._keys):
+        self._bindings[(report_request_id, r_id)] = stream_id
+        self._stream_bindings[stream_id] = (report_request_id, r_id)
+    logger.info(
+      f'Loaded {len(self._keys)} report streams and {len(self._bindings)} report bindings.'
+    )
+    return len(self._keys)
+
+  def _add(self, key: tuple, row: tuple) -> int:
+    stream_id = len(self._keys)
+    self._stream_ids[key] = stream_id
+    self._keys.append(key)
+    self._rows.append(row)
+    self._callbacks.append(StreamCallback(stream_id, self.handler))
+    return stream_id
+
+  def register(
+    self,
+    ven_id: str,
+    resource_id: str,
+    measurement: str,
+    unit=None,
+    scale=None,
+    sampling_interval: timedelta | None = None,
+    max_sampling_interval: timedelta | None = None,
+  ) -> int:
+    """
+    Registers a stream, or updates it if it is already known.
+
+    `max_sampling_interval` is the longest interval the VEN offered, kept so
+    the stream can be slowed down again after a restart.
+
+    The stream is only written to storage if it is new or one of its
+    properties changed.
+
+    Returns
+    -------
+    int
+        The stream id.
+    """
+    key = (ven_id, resource_id, measurement)
+    seconds = sampling_interval.total_seconds() if sampling_interval else None
+    max_seconds = (
+      max_sampling_interval.total_seconds() if max_sampling_interval else None
+    )
+    stream_id = self._stream_ids.get(key)
+    row = (
+      len(self._keys) if stream_id is None else stream_id,
+      ven_id,
+      resource_id,
+      measurement,
+      unit,
+      scale,
+      seconds,
+      max_seconds,
+    )
+
+    if stream_id is None:
+      stream_id = self._add(key, row)
+    elif self._rows[stream_id] == row:
+      return stream_id
+    else:
+      self._rows[stream_id] = row
+
+    self.storage.save_stream(*row)
+    return stream_id
+
+  def stream_id(self, ven_id: str, resource_id: str, measurement: str):
+    """Returns the id of a stream, or None if it is not registered."""
+    return self._stream_ids.get((ven_id, resource_id, measurement))
+
+  def key(self, stream_id: int) -> tuple:
+    """Returns the (ven_id, resource_id, measurement) triple of a stream."""
+    return self._keys[stream_id]
+
+  def sampling_interval(self, stream_id: int):
+    """Returns the negotiated sampling interval of a stream, or None."""
+    seconds = self._rows[stream_id][6]
+    return None if seconds is None else timedelta(seconds=seconds)
+
+  def max_sampling_interval(self, stream_id: int):
+    """Returns the longest sampling interval the VEN offered for a stream, or None."""
+    seconds = self._rows[stream_id][7]
+    return None if seconds is None else timedelta(seconds=seconds)
+
+  def callback(self, stream_id: int) -> StreamCallback:
+    return self._callbacks[stream_id]
+
+  def bindings(self) -> ReportBindings:
+    """Returns a table that binds the callbacks openleadr registers, see ReportBindings."""
+    return ReportBindings(self)
+
+  def bind(self, report_request_id: str, r_id: str, stream_id: int):
+    """
+    Binds a report request of a VEN to a stream and persists the binding.
+
+    The binding replaces the earlier binding of the stream, which belongs to a
+    report request of a previous registration.
+    """
+    key = (report_request_id, r_id)
+    if self._bindings.get(key) == stream_id:
+      return
+    old_key = self._stream_bindings.get(stream_id)
+    if old_key is not None and self._bindings.get(old_key) == stream_id:
+      del self._bindings[old_key]
+    self._bindings[key] = stream_id
+    self._stream_bindings[stream_id] = key
+    self.storage.save_report_binding(report_request_id, r_id, stream_id)
+
+  def route(self, report_request_id: str, r_id: str):
+    """Returns the stream a report request delivers data for, or None if unbound."""
+    return self._bindings.get((report_request_id, r_id))
@@ -1,12 +1,30 @@
 # src/sqlite/__main__.py
+import argparse
 
-from .sqlite import Database
+from dotenv import load_dotenv
+
+from src.openleadr_node.config.config import Container
+from src.storage import create_storage
+from src.storage.roster import load_roster
 
 
 # Example usage
 def main():
-  db_path = './src/database/openleadr.db'
-  db = Database(db_path)
+  load_dotenv()
+  parser = argparse.ArgumentParser(description='Initialize the VTN database.')
+  parser.add_argument('--db-name', default='./src/database/openleadr.db')
+  parser.add_argument(
+    '--import-roster',
+    metavar='PATH',
+    help='Provision the VENs of a .csv or .json roster in one transaction.',
+  )
+  args = parser.parse_args()
+
+  # Write to the backend the VTN reads, see STORAGE_BACKEND.
+  backend = Container().config().get_storage_backend()
+  if backend == 'memory':
+    parser.error('The memory storage backend does not persist, nothing to initialize.')
+  db = create_storage(backend, args.db_name)
 
   if not db.fetch_ven(ven_name='ven123'):
     db.create_table()
@@ -14,7 +32,12 @@ def main():
 
     db.update_ven('ven123', 'VEN_ID_001', 'REG_ID_001')
 
-  print('Database initialized.')
+  if args.import_roster:
+    roster = load_roster(args.import_roster)
+    added = db.insert_vens(roster)
+    print(f'Imported {added} of {len(roster)} VENs from {args.import_roster}.')
+
+  print(f'Database initialized ({backend} backend).')
   db.close()
 
 
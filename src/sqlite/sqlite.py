@@ -1,11 +1,21 @@
 import os
 import sqlite3
+from datetime import UTC, datetime
 
+from src.storage.storage_interface import (
+  StorageInterface,
+  decode_value_row,
+  is_offset,
+  to_timestamp,
+)
 
-class Database:
+
+class Database(StorageInterface):
   """
   A class to represent and manage SQLite database operations for VEN registrations.
 
+  This is the default storage backend.
+
   Attributes
   ----------
   db_name : str
@@ -21,12 +31,36 @@ class Database:
       Creates the 'vens' table if it doesn't exist.
   insert_ven(ven_name, ven_id=None, registration_id=None):
       Inserts a new VEN entry into the 'vens' table.
+  insert_vens(rows):
+      Inserts many VEN entries into the 'vens' table in one transaction.
   update_ven(ven_name, ven_id, registration_id):
       Updates the ven_id and registration_id for a given ven_name.
+  update_vens(rows):
+      Updates many VEN entries in one transaction.
   fetch_vens():
       Retrieves all VEN entries from the 'vens' table.
   fetch_ven(ven_id=None, ven_name=None):
       Retrieves a specific VEN entry from the 'vens' table by id or name.
+  store_values(ven_id, time, value):
+      Inserts a meter value into the 'metervalues' table.
+  store_many_values(rows):
+      Inserts many meter values into the 'metervalues' table in one transaction.
+  fetch_values(ven_id, start=None, end=None):
+      Retrieves the meter values of a VEN within a time range.
+  fetch_values_page(ven_id, start=None, end=None, cursor=None, limit=1000, resolution=None):
+      Retrieves one page of meter values, optionally averaged per time bucket.
+  validate_cursor(cursor, resolution=None):
+      Checks the shape of a cursor returned by fetch_values_page.
+  save_stream(stream_id, ven_id, resource_id, measurement, unit, scale, sampling_interval,
+              max_sampling_interval):
+      Inserts or updates a row in the 'report_streams' table.
+  fetch_streams():
+      Retrieves all rows of the 'report_streams' table ordered by id.
+  save_report_binding(report_request_id, r_id, stream_id):
+      Inserts or updates a row in the 'report_bindings' table, deleting the
+    earlier bindings of the stream.
+  fetch_report_bindings():
+      Retrieves all rows of the 'report_bindings' table.
   close():
       Closes the connection to the database.
   """
@@ -49,7 +83,8 @@ class Database:
     db_directory = os.path.dirname(self.db_name)
     os.makedirs(db_directory, exist_ok=True)
 
-    return sqlite3.connect(self.db_name)
+    # The charts read through their own instance from the Dash worker threads.
+    return sqlite3.connect(self.db_name, check_same_thread=False)
 
   def create_table(self):
     """
@@ -85,6 +120,62 @@ class Database:
                 """
       )
 
+      cursor.execute(
+        """
+                CREATE INDEX IF NOT EXISTS metervalues_ven_id_time
+                ON metervalues (ven_id, time)
+                """
+      )
+
+      cursor.execute(
+        """
+                CREATE TABLE IF NOT EXISTS report_streams (
+                    id INTEGER PRIMARY KEY,
+                    ven_id TEXT NOT NULL,
+                    resource_id TEXT,
+                    measurement TEXT,
+                    unit TEXT,
+                    scale TEXT,
+                    sampling_interval REAL,
+                    max_sampling_interval REAL,
+                    UNIQUE (ven_id, resource_id, measurement)
+                )
+                """
+      )
+      columns = [row[1] for row in cursor.execute('PRAGMA table_info(report_streams)')]
+      if 'max_sampling_interval' not in columns:
+        cursor.execute(
+          'ALTER TABLE report_streams ADD COLUMN max_sampling_interval REAL'
+        )
+
+      cursor.execute(
+        """
+                CREATE TABLE IF NOT EXISTS report_bindings (
+                    report_request_id TEXT NOT NULL,
+                    r_id TEXT NOT NULL,
+                    stream_id INTEGER NOT NULL,
+                    PRIMARY KEY (report_request_id, r_id)
+                )
+                """
+      )
+
+      cursor.execute(
+        """
+                CREATE INDEX IF NOT EXISTS report_bindings_stream_id
+                ON report_bindings (stream_id)
+                """
+      )
+
+      # Older versions kept every binding of a stream, keep only the latest.
+      cursor.execute(
+        """
+                DELETE FROM report_bindings
+                WHERE rowid NOT IN (
+                    SELECT MAX(rowid) FROM report_bindings GROUP BY stream_id
+                )
+                """
+      )
+
   def insert_ven(self, ven_name, ven_id=None, registration_id=None):
     """
     Inserts a new VEN entry into the 'vens' table.
@@ -132,6 +223,55 @@ class Database:
         (ven_id, registration_id, ven_name),
       )
 
+  def insert_vens(self, rows) -> int:
+    """
+    Inserts many VEN entries into the 'vens' table in one transaction.
+
+    Names that already exist are skipped.
+
+    Parameters
+    ----------
+    rows : iterable of tuple
+        (ven_name, ven_id, registration_id) tuples, the ids may be None.
+
+    Returns
+    -------
+    int
+        The number of VENs inserted.
+    """
+    with self.conn:
+      cursor = self.conn.cursor()
+      cursor.executemany(
+        """
+                INSERT OR IGNORE INTO vens (name, ven_id, registration_id)
+                VALUES (?, ?, ?)
+                """,
+        rows,
+      )
+      return cursor.rowcount
+
+  def update_vens(self, rows):
+    """
+    Updates the ven_id and registration_id of many VENs in one transaction.
+
+    Parameters
+    ----------
+    rows : iterable of tuple
+        (ven_name, ven_id, registration_id) tuples.
+    """
+    with self.conn:
+      self.conn.executemany(
+        """
+                UPDATE vens
+                SET ven_id = ?, registration_id = ?
+                WHERE name = ?
+                """,
+        (
+          (ven_id, registration_id, ven_name)
+          for ven_name, ven_id, registration_id in rows
+        ),
+      )
+
   def fetch_vens(self):
     """
     Retrieves all VEN entries from the 'vens' table.
@@ -170,7 +310,7 @@ class Database:
       return None
     return cursor.fetchone()
 
-  def store_values(self, ven_id: str, time: str, value: str):
+  def store_values(self, ven_id: str, time, value):
     with self.conn:
       cursor = self.conn.cursor()
       cursor.execute(
@@ -178,11 +318,321 @@ class Database:
                 INSERT INTO metervalues (ven_id, time, value)
                 VALUES (?, ?, ?)
                 """,
-        (ven_id, time, value),
+        (ven_id, _encode_time(time), value),
+      )
+
+  def store_many_values(self, rows):
+    """
+    Inserts many meter values into the 'metervalues' table in one transaction.
+
+    Parameters
+    ----------
+    rows : iterable of tuple
+        (ven_id, time, value) tuples.
+    """
+    with self.conn:
+      self.conn.executemany(
+        """
+                INSERT INTO metervalues (ven_id, time, value)
+                VALUES (?, ?, ?)
+                """,
+        ((ven_id, _encode_time(time), value) for ven_id, time, value in rows),
+      )
+
+  def fetch_values(self, ven_id: str, start=None, end=None):
+    """
+    Retrieves the meter values of a VEN ordered by time.
+
+    Parameters
+    ----------
+    ven_id : str
+        The ID of the VEN.
+    start : datetime, optional
+        Inclusive lower bound of the time range.
+    end : datetime, optional
+        Exclusive upper bound of the time range.
+
+    Returns
+    -------
+    list of tuple
+        A list of (time, value) tuples.
+    """
+    query = 'SELECT time, value FROM metervalues WHERE ven_id = ?'
+    params = [ven_id]
+    if start is not None:
+      query += ' AND time >= ?'
+      params.append(_encode_time(start))
+    if end is not None:
+      query += ' AND time < ?'
+      params.append(_encode_time(end))
+    query += ' ORDER BY time'
+
+    cursor = self.conn.cursor()
+    cursor.execute(query, params)
+    return [decode_value_row(time, value) for time, value in cursor.fetchall()]
+
+  def fetch_values_page(
+    self, ven_id: str, start=None, end=None, cursor=None, limit=1000, resolution=None
+  ):
+    """
+    Retrieves one page of the meter values of a VEN ordered by time.
+
+    Pages are read by keyset on the (ven_id, time) index: the cursor is the
+    (time, id) of the last row, or the start of the last bucket of the page when
+    values are averaged per `resolution` seconds. An averaged page aggregates
+    only the `limit` buckets from the first value after the cursor on, so every
+    page costs the same no matter how deep it is or how much data follows.
+
+    Parameters
+    ----------
+    ven_id : str
+        The ID of the VEN.
+    start : datetime, optional
+        Inclusive lower bound of the time range.
+    end : datetime, optional
+        Exclusive upper bound of the time range.
+    cursor : list, optional
+        The cursor returned with the previous page, None for the first page.
+    limit : int
+        The maximum number of rows in the page.
+    resolution : int, optional
+        The bucket size in seconds to average values over.
+
+    Returns
+    -------
+    tuple
+        (rows, next_cursor) with a list of (time, value) tuples and the cursor
+        for the next page, None if this is the last page.
+    """
+    where = 'WHERE ven_id = ?'
+    params = [ven_id]
+    if start is not None:
+      where += ' AND time >= ?'
+      params.append(_encode_time(start))
+    if end is not None:
+      where += ' AND time < ?'
+      params.append(_encode_time(end))
+
+    db_cursor = self.conn.cursor()
+    if resolution:
+      resolution = int(resolution)
+      if cursor is not None:
+        # Resume at the bucket after the cursor, so the range before it is not
+        # aggregated again.
+        where += ' AND time >= ?'
+        params.append(_encode_time(datetime.fromtimestamp(cursor + resolution, tz=UTC)))
+      # Aggregate only the `limit` buckets from the first remaining value on, so
+      # a page never scans the rest of the range. The bounds come from the index.
+      db_cursor.execute(f'SELECT MIN(time) FROM metervalues {where}', params)
+      first = db_cursor.fetchone()[0]
+      if first is None:
+        return [], None
+      first_bucket = int(to_timestamp(first)) // resolution * resolution
+      window_end = _encode_time(
+        datetime.fromtimestamp(first_bucket + limit * resolution, tz=UTC)
+      )
+
+      bucket = f"CAST(strftime('%s', time) AS INTEGER) / {resolution} * {resolution}"
+      db_cursor.execute(
+        f"""
+            SELECT {bucket} AS bucket, AVG(CAST(value AS REAL))
+            FROM metervalues {where} AND time < ?
+            GROUP BY bucket
+            ORDER BY bucket
+            """,
+        (*params, window_end),
+      )
+      rows = [
+        (datetime.fromtimestamp(bucket, tz=UTC), value)
+        for bucket, value in db_cursor.fetchall()
+      ]
+      db_cursor.execute(
+        f'SELECT 1 FROM metervalues {where} AND time >= ? LIMIT 1',
+        (*params, window_end),
+      )
+      more = db_cursor.fetchone() is not None
+      next_cursor = first_bucket + (limit - 1) * resolution if more else None
+      return rows, next_cursor
+
+    if cursor is not None:
+      where += ' AND (time, id) > (?, ?)'
+      params.extend(cursor)
+    db_cursor.execute(
+      f"""
+            SELECT time, value, id
+            FROM metervalues {where}
+            ORDER BY time, id
+            LIMIT ?
+            """,
+      (*params, limit),
+    )
+    page = db_cursor.fetchall()
+    next_cursor = [page[-1][0], page[-1][2]] if len(page) == limit else None
+    return [decode_value_row(time, value) for time, value, _ in page], next_cursor
+
+  def validate_cursor(self, cursor, resolution=None):
+    """
+    Checks that a cursor has the shape `fetch_values_page` returns: the start of
+    a bucket when values are averaged, a [time, id] pair otherwise.
+
+    Raises
+    ------
+    ValueError
+        If the cursor is not None and has the wrong shape.
+    """
+    if cursor is None:
+      return
+    if resolution:
+      if not is_offset(cursor):
+        raise ValueError('The cursor must be the start of a bucket.')
+    elif not (
+      isinstance(cursor, list)
+      and len(cursor) == 2
+      and isinstance(cursor[0], str)
+      and is_offset(cursor[1])
+    ):
+      raise ValueError('The cursor must be a [time, id] pair.')
+
+  def save_stream(
+    self,
+    stream_id: int,
+    ven_id: str,
+    resource_id: str,
+    measurement: str,
+    unit=None,
+    scale=None,
+    sampling_interval=None,
+    max_sampling_interval=None,
+  ):
+    """
+    Inserts or updates a row in the 'report_streams' table.
+
+    Parameters
+    ----------
+    stream_id : int
+        The compact id of the stream, used as primary key.
+    ven_id : str
+        The ID of the VEN.
+    resource_id : str
+        The ID of the resource.
+    measurement : str
+        The type of measurement.
+    unit : str, optional
+        The unit of measurement.
+    scale : str, optional
+        The scale of measurement.
+    sampling_interval : float, optional
+        The negotiated sampling interval in seconds.
+    max_sampling_interval : float, optional
+        The longest sampling interval in seconds the VEN offered.
+    """
+    with self.conn:
+      cursor = self.conn.cursor()
+      cursor.execute(
+        """
+                INSERT INTO report_streams
+                    (id, ven_id, resource_id, measurement, unit, scale, sampling_interval,
+                    max_sampling_interval)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    unit = excluded.unit,
+                    scale = excluded.scale,
+                    sampling_interval = excluded.sampling_interval,
+                    max_sampling_interval = excluded.max_sampling_interval
+                """,
+        (
+          stream_id,
+          ven_id,
+          resource_id,
+          measurement,
+          unit,
+          scale,
+          sampling_interval,
+          max_sampling_interval,
+        ),
+      )
+
+  def fetch_streams(self):
+    """
+    Retrieves all rows of the 'report_streams' table ordered by id.
+
+    Returns
+    -------
+    list of tuple
+        (id, ven_id, resource_id, measurement, unit, scale, sampling_interval,
+        max_sampling_interval) tuples.
+    """
+    cursor = self.conn.cursor()
+    cursor.execute(
+      """
+            SELECT id, ven_id, resource_id, measurement, unit, scale, sampling_interval,
+                max_sampling_interval
+            FROM report_streams
+            ORDER BY id
+            """
+    )
+    return cursor.fetchall()
+
+  def save_report_binding(self, report_request_id: str, r_id: str, stream_id: int):
+    """
+    Inserts or updates a row in the 'report_bindings' table, deleting the
+    earlier bindings of the stream.
+
+    Parameters
+    ----------
+    report_request_id : str
+        The reportRequestID the VTN assigned when the report was registered.
+    r_id : str
+        The rID of the report description within the report request.
+    stream_id : int
+        The compact id of the stream.
+    """
+    with self.conn:
+      cursor = self.conn.cursor()
+      cursor.execute('DELETE FROM report_bindings WHERE stream_id = ?', (stream_id,))
+      cursor.execute(
+        """
+                INSERT OR REPLACE INTO report_bindings (report_request_id, r_id, stream_id)
+                VALUES (?, ?, ?)
+                """,
+        (report_request_id, r_id, stream_id),
       )
 
+  def fetch_report_bindings(self):
+    """
+    Retrieves all rows of the 'report_bindings' table.
+
+    Returns
+    -------
+    list of tuple
+        (report_request_id, r_id, stream_id) tuples.
+    """
+    cursor = self.conn.cursor()
+    cursor.execute('SELECT report_request_id, r_id, stream_id FROM report_bindings')
+    return cursor.fetchall()
+
   def close(self):
     """
     Closes the connection to the SQLite database.
     """
     self.conn.close()
+
+
+def _encode_time(time) -> str:
+  """
+  Converts a meter value time to the text it is stored and compared as.
+
+  Times are stored as UTC with a fixed width, e.g. '2026-01-01 00:00:00.000000+00:00',
+  so comparing the text compares the times and range bounds can use the index.
+  The space separator keeps the text comparable with rows written by older
+  versions through the default sqlite3 adapter. Naive datetimes are taken to be
+  UTC, strings that are not ISO 8601 are stored as they are.
+  """
+  if isinstance(time, str):
+    try:
+      time = datetime.fromisoformat(time)
+    except ValueError:
+      return time
+  if time.tzinfo is None:
+    time = time.replace(tzinfo=UTC)
+  return time.astimezone(UTC).strftime('%Y-%m-%d %H:%M:%S.%f+00:00')
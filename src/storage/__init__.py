@@ -0,0 +1,8 @@
+# __init__.py
+
+__version__ = '1.0.0'
+
+from .storage_factory import STORAGE_BACKENDS, create_storage
+from .storage_interface import StorageInterface
+
+__all__ = ['STORAGE_BACKENDS', 'StorageInterface', 'create_storage']
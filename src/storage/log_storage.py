@@ -0,0 +1,476 @@
+import bisect
+import contextlib
+import json
+import logging
+import os
+import threading
+import time as clock
+from array import array
+from datetime import datetime
+
+from src.storage.storage_interface import (
+  StorageInterface,
+  bucket_values,
+  decode_value_row,
+  replace_binding,
+  to_timestamp,
+)
+
+try:
+  import fcntl
+except ImportError:
+  fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class LogStorage(StorageInterface):
+  """
+  An append-only, log-structured file backend optimized for sequential ingest.
+
+  Meter values are appended as tab-separated lines to '<path>.values.log'
+  through a large write buffer that is flushed every `flush_every` records or
+  `flush_interval` seconds, whichever comes first, so ingest never seeks and
+  never waits for a commit. The VEN registry is a small JSON-lines log in
+  '<path>.vens.log' that is replayed on open, the last record for a VEN name
+  wins, and report streams and their bindings are kept the same way in
+  '<path>.streams.log' and '<path>.bindings.log'.
+
+  An in-memory index holds the time and file offset of every meter value per
+  VEN, sorted by time. It is rebuilt with one scan of the value log on open,
+  after which range queries and pages flush the buffer and read only the lines
+  they return. `create_storage` shares one instance per path within a process, so
+  readers see the values still in the write buffer. The index assumes a single
+  writer, so the logs are locked to one process with an exclusive lock on
+  '<path>.lock' where `fcntl` is available.
+
+  A crash can leave a partial record at the end of a log. It is truncated on
+  open, losing only the records that were never completely written.
+
+  Attributes
+  ----------
+  path : str
+      The path prefix of the log files.
+  flush_every : int
+      The number of buffered meter values after which the buffer is flushed.
+  flush_interval : float
+      The seconds after which a write flushes the buffer, however full it is.
+  closed : bool
+      Whether the logs were closed.
+  """
+
+  def __init__(
+    self, path='test.db', flush_every=1024, buffer_size=1 << 20, flush_interval=1.0
+  ):
+    self.path = path
+    self.flush_every = flush_every
+    self.flush_interval = flush_interval
+    self.closed = False
+    self._lock = threading.Lock()
+    self._pending = 0
+    self._flushed_at = clock.monotonic()
+
+    directory = os.path.dirname(self.path)
+    if directory:
+      os.makedirs(directory, exist_ok=True)
+
+    self._vens_path = f'{self.path}.vens.log'
+    self._values_path = f'{self.path}.values.log'
+    self._streams_path = f'{self.path}.streams.log'
+    self._bindings_path = f'{self.path}.bindings.log'
+
+    self._files = contextlib.ExitStack()
+    try:
+      self._lock_logs()
+      for log_path in (
+        self._vens_path,
+        self._values_path,
+        self._streams_path,
+        self._bindings_path,
+      ):
+        _truncate_partial_record(log_path)
+      self._open_logs(buffer_size)
+    except BaseException:
+      self._files.close()
+      raise
+
+  def _lock_logs(self):
+    """
+    Takes the exclusive lock on the logs.
+
+    Raises
+    ------
+    RuntimeError
+        If another process holds the lock.
+    """
+    # The logs stay open until `close`, the exit stack closes them.
+    lock_file = self._files.enter_context(open(f'{self.path}.lock', 'a'))  # noqa: SIM115
+    if fcntl is None:
+      return
+    try:
+      fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+      raise RuntimeError(f'{self.path} is in use by another process.') from None
+
+  def _open_logs(self, buffer_size: int):
+    self._vens = self._replay_vens()
+    self._streams = self._replay_streams()
+    self._bindings = self._replay_bindings()
+    self._index = {}
+    self._size = self._replay_values()
+    enter = self._files.enter_context
+    self._vens_file = enter(open(self._vens_path, 'a', encoding='utf-8'))  # noqa: SIM115
+    self._streams_file = enter(open(self._streams_path, 'a', encoding='utf-8'))  # noqa: SIM115
+    self._bindings_file = enter(open(self._bindings_path, 'a', encoding='utf-8'))  # noqa: SIM115
+    self._values_file = enter(open(self._values_path, 'ab', buffering=buffer_size))  # noqa: SIM115
+
+  def _replay_vens(self):
+    """
+    Rebuilds the VEN registry from its log.
+
+    Returns
+    -------
+    dict
+        Mapping of VEN names to (id, name, ven_id, registration_id) tuples.
+    """
+    vens = {}
+    if not os.path.exists(self._vens_path):
+      return vens
+
+    with open(self._vens_path, encoding='utf-8') as vens_file:
+      for line in vens_file:
+        record = json.loads(line)
+        row_id = vens[record['name']][0] if record['name'] in vens else len(vens) + 1
+        vens[record['name']] = (
+          row_id,
+          record['name'],
+          record['ven_id'],
+          record['registration_id'],
+        )
+    return vens
+
+  def _replay_streams(self):
+    """
+    Rebuilds the report streams from their log.
+
+    Returns
+    -------
+    dict
+        Mapping of stream ids to report stream tuples.
+    """
+    streams = {}
+    if not os.path.exists(self._streams_path):
+      return streams
+
+    with open(self._streams_path, encoding='utf-8') as streams_file:
+      for line in streams_file:
+        row = tuple(json.loads(line))
+        # Records of older versions have no max_sampling_interval.
+        streams[row[0]] = row + (None,) * (8 - len(row))
+    return streams
+
+  def _replay_bindings(self):
+    """
+    Rebuilds the report bindings from their log.
+
+    Returns
+    -------
+    dict
+        Mapping of (report_request_id, r_id) to stream ids.
+    """
+    bindings = {}
+    if not os.path.exists(self._bindings_path):
+      return bindings
+
+    records = 0
+    with open(self._bindings_path, encoding='utf-8') as bindings_file:
+      for line in bindings_file:
+        report_request_id, r_id, stream_id = json.loads(line)
+        replace_binding(bindings, (report_request_id, r_id), stream_id)
+        records += 1
+
+    # Every re-registration binds the streams again, drop the replaced records.
+    if records > len(bindings):
+      compacted = f'{self._bindings_path}.compact'
+      with open(compacted, 'w', encoding='utf-8') as bindings_file:
+        for (report_request_id, r_id), stream_id in bindings.items():
+          bindings_file.write(json.dumps([report_request_id, r_id, stream_id]) + '\n')
+      os.replace(compacted, self._bindings_path)
+    return bindings
+
+  def _replay_values(self) -> int:
+    """
+    Rebuilds the index of the value log.
+
+    Returns
+    -------
+    int
+        The size of the value log in bytes.
+    """
+    if not os.path.exists(self._values_path):
+      return 0
+
+    offset = 0
+    with open(self._values_path, 'rb') as values_file:
+      for line in values_file:
+        ven_id, time, _ = line.decode().split('\t')
+        self._add_to_index(ven_id, _index_time(time), offset)
+        offset += len(line)
+    return offset
+
+  def _add_to_index(self, ven_id: str, timestamp: float, offset: int):
+    times, offsets = self._index.setdefault(ven_id, (array('d'), array('q')))
+    if not times or times[-1] <= timestamp:
+      times.append(timestamp)
+      offsets.append(offset)
+    else:
+      # Out-of-order sample, keep the index sorted by time.
+      position = bisect.bisect_right(times, timestamp)
+      times.insert(position, timestamp)
+      offsets.insert(position, offset)
+
+  def _append_ven(self, ven_name, ven_id, registration_id, flush=True):
+    record = {'name': ven_name, 'ven_id': ven_id, 'registration_id': registration_id}
+    self._vens_file.write(json.dumps(record) + '\n')
+    if flush:
+      self._vens_file.flush()
+
+  def insert_ven(self, ven_name, ven_id=None, registration_id=None):
+    """
+    Inserts a new VEN entry.
+
+    Raises
+    ------
+    ValueError
+        If a VEN with the same name already exists.
+    """
+    with self._lock:
+      if ven_name in self._vens:
+        raise ValueError(f'VEN {ven_name} already exists.')
+      self._append_ven(ven_name, ven_id, registration_id)
+      self._vens[ven_name] = (len(self._vens) + 1, ven_name, ven_id, registration_id)
+
+  def update_ven(self, ven_name, ven_id, registration_id):
+    with self._lock:
+      row = self._vens.get(ven_name)
+      if row is not None:
+        self._append_ven(ven_name, ven_id, registration_id)
+        self._vens[ven_name] = (row[0], ven_name, ven_id, registration_id)
+
+  def insert_vens(self, rows) -> int:
+    added = 0
+    with self._lock:
+      for ven_name, ven_id, registration_id in rows:
+        if ven_name not in self._vens:
+          self._append_ven(ven_name, ven_id, registration_id, flush=False)
+          self._vens[ven_name] = (
+            len(self._vens) + 1,
+            ven_name,
+            ven_id,
+            registration_id,
+          )
+          added += 1
+      self._vens_file.flush()
+    return added
+
+  def update_vens(self, rows):
+    with self._lock:
+      for ven_name, ven_id, registration_id in rows:
+        row = self._vens.get(ven_name)
+        if row is not None:
+          self._append_ven(ven_name, ven_id, registration_id, flush=False)
+          self._vens[ven_name] = (row[0], ven_name, ven_id, registration_id)
+      self._vens_file.flush()
+
+  def fetch_vens(self):
+    with self._lock:
+      return list(self._vens.values())
+
+  def fetch_ven(self, ven_id=None, ven_name=None):
+    with self._lock:
+      if ven_id is not None:
+        return next((row for row in self._vens.values() if row[2] == ven_id), None)
+      if ven_name is not None:
+        return self._vens.get(ven_name)
+      return None
+
+  def save_stream(
+    self,
+    stream_id: int,
+    ven_id: str,
+    resource_id: str,
+    measurement: str,
+    unit=None,
+    scale=None,
+    sampling_interval=None,
+    max_sampling_interval=None,
+  ):
+    row = (
+      stream_id,
+      ven_id,
+      resource_id,
+      measurement,
+      unit,
+      scale,
+      sampling_interval,
+      max_sampling_interval,
+    )
+    with self._lock:
+      self._streams_file.write(json.dumps(row) + '\n')
+      self._streams_file.flush()
+      self._streams[stream_id] = row
+
+  def fetch_streams(self):
+    with self._lock:
+      return [self._streams[stream_id] for stream_id in sorted(self._streams)]
+
+  def save_report_binding(self, report_request_id: str, r_id: str, stream_id: int):
+    with self._lock:
+      self._bindings_file.write(json.dumps([report_request_id, r_id, stream_id]) + '\n')
+      self._bindings_file.flush()
+      replace_binding(self._bindings, (report_request_id, r_id), stream_id)
+
+  def fetch_report_bindings(self):
+    with self._lock:
+      return [(*key, stream_id) for key, stream_id in self._bindings.items()]
+
+  def store_values(self, ven_id: str, time, value):
+    self.store_many_values([(ven_id, time, value)])
+
+  def store_many_values(self, rows):
+    rows = list(rows)
+    lines = [_encode_value_line(ven_id, time, value) for ven_id, time, value in rows]
+
+    with self._lock:
+      for (ven_id, time, _), line in zip(rows, lines, strict=True):
+        self._add_to_index(ven_id, _index_time(time), self._size)
+        self._size += len(line)
+      self._values_file.write(b''.join(lines))
+      self._pending += len(lines)
+      if (
+        self._pending >= self.flush_every
+        or clock.monotonic() - self._flushed_at >= self.flush_interval
+      ):
+        self._flush()
+
+  def _flush(self):
+    self._values_file.flush()
+    self._pending = 0
+    self._flushed_at = clock.monotonic()
+
+  def flush(self):
+    """
+    Writes all buffered meter values to the value log.
+    """
+    with self._lock:
+      self._flush()
+
+  def fetch_values(self, ven_id: str, start=None, end=None):
+    with self._lock:
+      self._flush()
+      times, offsets = self._index.get(ven_id, ((), ()))
+      low, high = _index_range(times, start, end)
+      offsets = offsets[low:high]
+    return self._read_rows(offsets)
+
+  def fetch_values_page(
+    self, ven_id: str, start=None, end=None, cursor=None, limit=1000, resolution=None
+  ):
+    """
+    Retrieves one page of meter values through the index.
+
+    Without a resolution the cursor is a position in the index of the VEN, as
+    in `MemoryStorage`. With a resolution it is the start of the last bucket,
+    and only the values of the `limit` buckets after it are read.
+    """
+    with self._lock:
+      self._flush()
+      times, offsets = self._index.get(ven_id, ((), ()))
+      low, high = _index_range(times, start, end)
+
+      if not resolution:
+        low = max(low, cursor or 0)
+        next_low = min(low + limit, high)
+        page = offsets[low:next_low]
+        next_cursor = next_low if next_low < high else None
+      else:
+        if cursor is not None:
+          low = max(low, bisect.bisect_left(times, cursor + resolution))
+        # Unparseable times are indexed first and cannot be bucketed.
+        low = max(low, bisect.bisect_right(times, float('-inf')))
+        next_low, next_cursor = high, None
+        if low < high:
+          first = int(times[low] // resolution * resolution)
+          window_end = first + limit * resolution
+          next_low = max(low, bisect.bisect_left(times, window_end, low, high))
+          if next_low < high:
+            next_cursor = window_end - resolution
+        page = offsets[low:next_low]
+
+    rows = self._read_rows(page)
+    if resolution:
+      rows = bucket_values(rows, resolution)
+    return rows, next_cursor
+
+  def _read_rows(self, offsets) -> list:
+    rows = []
+    with open(self._values_path, 'rb') as values_file:
+      for offset in offsets:
+        values_file.seek(offset)
+        _, time, value = values_file.readline().decode().rstrip('\n').split('\t')
+        rows.append(decode_value_row(time, value))
+    return rows
+
+  def close(self):
+    """
+    Flushes the write buffer and closes all logs.
+    """
+    with self._lock:
+      self._flush()
+      self.closed = True
+      self._files.close()
+
+
+def _truncate_partial_record(path: str):
+  """
+  Truncates a log after its last complete record, which ends with a newline.
+  """
+  if not os.path.exists(path):
+    return
+  with open(path, 'rb+') as log_file:
+    size = log_file.seek(0, os.SEEK_END)
+    if size == 0:
+      return
+    # Records are short, search backwards for the last newline in chunks.
+    end = size
+    while end > 0:
+      start = max(0, end - 4096)
+      log_file.seek(start)
+      newline = log_file.read(end - start).rfind(b'\n')
+      if newline != -1:
+        end = start + newline + 1
+        break
+      end = start
+    if end < size:
+      logger.warning(f'Truncated a partial record of {size - end} bytes from {path}.')
+      log_file.truncate(end)
+
+
+def _encode_value_line(ven_id: str, time, value) -> bytes:
+  if isinstance(time, datetime):
+    time = time.isoformat()
+  return f'{ven_id}\t{time}\t{value}\n'.encode()
+
+
+def _index_range(times, start, end) -> tuple:
+  low = 0 if start is None else bisect.bisect_left(times, to_timestamp(start))
+  high = len(times) if end is None else bisect.bisect_left(times, to_timestamp(end))
+  return low, high
+
+
+def _index_time(time) -> float:
+  # Times that are not ISO 8601 sort first, they cannot be range queried.
+  try:
+    return to_timestamp(time)
+  except (TypeError, ValueError):
+    return float('-inf')
@@ -0,0 +1,157 @@
+import bisect
+import threading
+
+from src.storage.storage_interface import StorageInterface, replace_binding
+
+
+class MemoryStorage(StorageInterface):
+  """
+  A storage backend that keeps everything in process memory.
+
+  Intended for tests and benchmarks. Meter values are kept per VEN in two
+  parallel lists sorted by time, so range queries are a pair of binary searches.
+
+  Attributes
+  ----------
+  name : str
+      An identifier for the instance, used by the factory to share it.
+  """
+
+  def __init__(self, name='memory'):
+    self.name = name
+    self._lock = threading.Lock()
+    self._vens = {}
+    self._times = {}
+    self._values = {}
+    self._streams = {}
+    self._bindings = {}
+
+  def insert_ven(self, ven_name, ven_id=None, registration_id=None):
+    """
+    Inserts a new VEN entry.
+
+    Raises
+    ------
+    ValueError
+        If a VEN with the same name already exists.
+    """
+    with self._lock:
+      if ven_name in self._vens:
+        raise ValueError(f'VEN {ven_name} already exists.')
+      self._vens[ven_name] = (len(self._vens) + 1, ven_name, ven_id, registration_id)
+
+  def insert_vens(self, rows) -> int:
+    added = 0
+    with self._lock:
+      for ven_name, ven_id, registration_id in rows:
+        if ven_name not in self._vens:
+          self._vens[ven_name] = (
+            len(self._vens) + 1,
+            ven_name,
+            ven_id,
+            registration_id,
+          )
+          added += 1
+    return added
+
+  def update_ven(self, ven_name, ven_id, registration_id):
+    with self._lock:
+      row = self._vens.get(ven_name)
+      if row is not None:
+        self._vens[ven_name] = (row[0], ven_name, ven_id, registration_id)
+
+  def fetch_vens(self):
+    with self._lock:
+      return list(self._vens.values())
+
+  def fetch_ven(self, ven_id=None, ven_name=None):
+    with self._lock:
+      if ven_id is not None:
+        return next((row for row in self._vens.values() if row[2] == ven_id), None)
+      if ven_name is not None:
+        return self._vens.get(ven_name)
+      return None
+
+  def store_values(self, ven_id: str, time, value):
+    with self._lock:
+      self._append(ven_id, time, value)
+
+  def store_many_values(self, rows):
+    with self._lock:
+      for ven_id, time, value in rows:
+        self._append(ven_id, time, value)
+
+  def _append(self, ven_id: str, time, value):
+    times = self._times.setdefault(ven_id, [])
+    values = self._values.setdefault(ven_id, [])
+    if not times or times[-1] <= time:
+      times.append(time)
+      values.append(value)
+    else:
+      # Out-of-order sample, keep both lists sorted by time.
+      index = bisect.bisect_right(times, time)
+      times.insert(index, time)
+      values.insert(index, value)
+
+  def fetch_values(self, ven_id: str, start=None, end=None):
+    with self._lock:
+      times = self._times.get(ven_id, [])
+      values = self._values.get(ven_id, [])
+      low = 0 if start is None else bisect.bisect_left(times, start)
+      high = len(times) if end is None else bisect.bisect_left(times, end)
+      return list(zip(times[low:high], values[low:high], strict=True))
+
+  def fetch_values_page(
+    self, ven_id: str, start=None, end=None, cursor=None, limit=1000, resolution=None
+  ):
+    """
+    Retrieves one page of meter values, the cursor being an index into the
+    sorted values of the VEN.
+    """
+    if resolution:
+      return super().fetch_values_page(ven_id, start, end, cursor, limit, resolution)
+
+    with self._lock:
+      times = self._times.get(ven_id, [])
+      values = self._values.get(ven_id, [])
+      low = 0 if start is None else bisect.bisect_left(times, start)
+      low = max(low, cursor or 0)
+      high = len(times) if end is None else bisect.bisect_left(times, end)
+      next_low = min(low + limit, high)
+      rows = list(zip(times[low:next_low], values[low:next_low], strict=True))
+      return rows, next_low if next_low < high else None
+
+  def save_stream(
+    self,
+    stream_id: int,
+    ven_id: str,
+    resource_id: str,
+    measurement: str,
+    unit=None,
+    scale=None,
+    sampling_interval=None,
+    max_sampling_interval=None,
+  ):
+    with self._lock:
+      self._streams[stream_id] = (
+        stream_id,
+        ven_id,
+        resource_id,
+        measurement,
+        unit,
+        scale,
+        sampling_interval,
+        max_sampling_interval,
+      )
+
+  def fetch_streams(self):
+    with self._lock:
+      return [self._streams[stream_id] for stream_id in sorted(self._streams)]
+
+  def save_report_binding(self, report_request_id: str, r_id: str, stream_id: int):
+    with self._lock:
+      replace_binding(self._bindings, (report_request_id, r_id), stream_id)
+
+  def fetch_report_bindings(self):
+    with self._lock:
+      return [(*key, stream_id) for key, stream_id in self._bindings.items()]
@@ -0,0 +1,48 @@
+import csv
+import json
+import os
+
+
+def load_roster(path: str) -> list:
+  """
+  Reads a VEN roster for bulk provisioning.
+
+  CSV files need a header with a 'name' (or 'ven_name') column and may have
+  'ven_id' and 'registration_id' columns. JSON files hold a list of VEN names
+  or of objects with the same keys.
+
+  Parameters
+  ----------
+  path : str
+      The path of a .csv or .json roster file.
+
+  Returns
+  -------
+  list of tuple
+      (ven_name, ven_id, registration_id) tuples, the ids may be None.
+
+  Raises
+  ------
+  ValueError
+      If the file type is unknown or an entry has no name.
+  """
+  extension = os.path.splitext(path)[1].lower()
+  with open(path, encoding='utf-8', newline='') as roster_file:
+    if extension == '.csv':
+      entries = list(csv.DictReader(roster_file))
+    elif extension == '.json':
+      entries = json.load(roster_file)
+    else:
+      raise ValueError(f'Unsupported roster file {path}, expected .csv or .json.')
+
+  rows = []
+  for number, entry in enumerate(entries, start=1):
+    if isinstance(entry, str):
+      entry = {'name': entry}
+    name = entry.get('name') or entry.get('ven_name')
+    if not name:
+      raise ValueError(f'Roster entry {number} in {path} has no name.')
+    rows.append(
+      (name, entry.get('ven_id') or None, entry.get('registration_id') or None)
+    )
+  return rows
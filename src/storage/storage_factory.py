@@ -0,0 +1,57 @@
+import os
+
+from src.storage.storage_interface import StorageInterface
+
+STORAGE_BACKENDS = ('sqlite', 'memory', 'log')
+
+# Memory and log backends are shared by name, so that the server and the charts
+# running in the same process look at the same data, including values a log
+# backend still buffers.
+_shared_instances = {}
+
+
+def create_storage(backend: str, db_name: str) -> StorageInterface:
+  """
+  Creates the storage backend selected by name.
+
+  Parameters
+  ----------
+  backend : str
+      One of 'sqlite' (default), 'memory' or 'log'.
+  db_name : str
+      The SQLite database file, the log file path prefix, or the name of the
+      shared in-memory instance.
+
+  Returns
+  -------
+  StorageInterface
+      The storage backend instance.
+
+  Raises
+  ------
+  ValueError
+      If the backend name is unknown.
+  """
+  if backend is None or backend == 'sqlite':
+    from src.sqlite.sqlite import Database
+
+    return Database(db_name)
+  if backend == 'memory':
+    from src.storage.memory_storage import MemoryStorage
+
+    key = (backend, db_name)
+    if key not in _shared_instances:
+      _shared_instances[key] = MemoryStorage(db_name)
+    return _shared_instances[key]
+  if backend == 'log':
+    from src.storage.log_storage import LogStorage
+
+    key = (backend, os.path.abspath(db_name))
+    instance = _shared_instances.get(key)
+    if instance is None or instance.closed:
+      instance = _shared_instances[key] = LogStorage(db_name)
+    return instance
+
+  raise ValueError(
+    f'Unknown storage backend {backend!r}, expected one of {", ".join(STORAGE_BACKENDS)}.'
+  )
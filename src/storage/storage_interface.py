@@ -0,0 +1,343 @@
+from datetime import UTC, datetime
+
+
+class StorageInterface:
+  """
+  The storage protocol shared by all backends.
+
+  A backend keeps the VEN registry (the 'vens' table in SQLite terms) and the
+  meter values reported by the VENs. VEN rows are returned as
+  (id, name, ven_id, registration_id) tuples and meter values as (time, value)
+  tuples of a datetime and a float, regardless of how the backend stores them.
+  A time or value that cannot be converted is returned as stored.
+
+  Methods
+  -------
+  create_table():
+      Prepares the underlying storage, if required.
+  insert_ven(ven_name, ven_id=None, registration_id=None):
+      Adds a new VEN to the registry.
+  insert_vens(rows):
+      Adds many VENs to the registry at once, skipping known names.
+  update_ven(ven_name, ven_id, registration_id):
+      Updates the ven_id and registration_id for a given ven_name.
+  update_vens(rows):
+      Updates many VENs at once.
+  fetch_vens():
+      Retrieves all VEN entries.
+  fetch_ven(ven_id=None, ven_name=None):
+      Retrieves a specific VEN entry by id or name.
+  store_values(ven_id, time, value):
+      Appends a single meter value.
+  store_many_values(rows):
+      Appends many meter values at once.
+  fetch_values(ven_id, start=None, end=None):
+      Retrieves the meter values of a VEN within a time range.
+  fetch_values_page(ven_id, start=None, end=None, cursor=None, limit=1000, resolution=None):
+      Retrieves one page of meter values, optionally averaged per time bucket.
+  save_stream(stream_id, ven_id, resource_id, measurement, unit, scale, sampling_interval,
+              max_sampling_interval):
+      Inserts or updates a report stream.
+  fetch_streams():
+      Retrieves all report streams ordered by stream id.
+  close():
+      Releases the resources held by the backend.
+  """
+
+  def create_table(self):
+    """Prepares the underlying storage, if required."""
+
+  def insert_ven(self, ven_name, ven_id=None, registration_id=None):
+    """Adds a new VEN to the registry."""
+    raise NotImplementedError
+
+  def insert_vens(self, rows) -> int:
+    """
+    Adds many VENs to the registry at once, skipping names that already exist.
+
+    Backends override this to write all rows in a single transaction or write.
+
+    Parameters
+    ----------
+    rows : iterable of tuple
+        (ven_name, ven_id, registration_id) tuples, the ids may be None.
+
+    Returns
+    -------
+    int
+        The number of VENs added.
+    """
+    added = 0
+    for ven_name, ven_id, registration_id in rows:
+      if self.fetch_ven(ven_name=ven_name) is None:
+        self.insert_ven(ven_name, ven_id, registration_id)
+        added += 1
+    return added
+
+  def update_ven(self, ven_name, ven_id, registration_id):
+    """Updates the ven_id and registration_id for a given ven_name."""
+    raise NotImplementedError
+
+  def update_vens(self, rows):
+    """
+    Updates many VENs at once.
+
+    Backends override this to write all rows in a single transaction or write.
+
+    Parameters
+    ----------
+    rows : iterable of tuple
+        (ven_name, ven_id, registration_id) tuples.
+    """
+    for ven_name, ven_id, registration_id in rows:
+      self.update_ven(ven_name, ven_id, registration_id)
+
+  def fetch_vens(self):
+    """Retrieves all VEN entries as a list of tuples."""
+    raise NotImplementedError
+
+  def fetch_ven(self, ven_id=None, ven_name=None):
+    """Retrieves a specific VEN entry, or None if no match is found."""
+    raise NotImplementedError
+
+  def store_values(self, ven_id: str, time, value):
+    """Appends a single meter value for a VEN."""
+    raise NotImplementedError
+
+  def store_many_values(self, rows):
+    """
+    Appends many meter values at once.
+
+    Backends override this to write the rows in a single transaction or write.
+
+    Parameters
+    ----------
+    rows : iterable of tuple
+        (ven_id, time, value) tuples.
+    """
+    for ven_id, time, value in rows:
+      self.store_values(ven_id, time, value)
+
+  def fetch_values(self, ven_id: str, start=None, end=None):
+    """
+    Retrieves the meter values of a VEN ordered by time.
+
+    Parameters
+    ----------
+    ven_id : str
+        The ID of the VEN.
+    start : datetime, optional
+        Inclusive lower bound of the time range.
+    end : datetime, optional
+        Exclusive upper bound of the time range.
+
+    Returns
+    -------
+    list of tuple
+        A list of (time, value) tuples, see `decode_value_row`.
+    """
+    raise NotImplementedError
+
+  def fetch_values_page(
+    self, ven_id: str, start=None, end=None, cursor=None, limit=1000, resolution=None
+  ):
+    """
+    Retrieves one page of the meter values of a VEN ordered by time.
+
+    The default implementation pages through `fetch_values` by offset. Backends
+    override it with cheaper, keyset based paging.
+
+    Parameters
+    ----------
+    ven_id : str
+        The ID of the VEN.
+    start : datetime, optional
+        Inclusive lower bound of the time range.
+    end : datetime, optional
+        Exclusive upper bound of the time range.
+    cursor : optional
+        The cursor returned with the previous page, None for the first page.
+    limit : int
+        The maximum number of rows in the page.
+    resolution : int, optional
+        If given, values are averaged per bucket of `resolution` seconds and each
+        row holds the start of its bucket.
+
+    Returns
+    -------
+    tuple
+        (rows, next_cursor) with a list of (time, value) tuples and a JSON
+        serializable cursor for the next page, None if this is the last page.
+    """
+    rows = self.fetch_values(ven_id, start, end)
+    if resolution:
+      rows = bucket_values(rows, resolution)
+    offset = cursor or 0
+    next_offset = offset + limit
+    return rows[offset:next_offset], next_offset if next_offset < len(rows) else None
+
+  def validate_cursor(self, cursor, resolution=None):
+    """
+    Checks that a cursor, e.g. one sent back by a client, has the shape that
+    `fetch_values_page` returns for the same resolution.
+
+    The default implementation expects an offset, as returned by the default
+    `fetch_values_page`.
+
+    Raises
+    ------
+    ValueError
+        If the cursor is not None and has the wrong shape.
+    """
+    if cursor is not None and not is_offset(cursor):
+      raise ValueError('The cursor must be a non-negative integer.')
+
+  def save_stream(
+    self,
+    stream_id: int,
+    ven_id: str,
+    resource_id: str,
+    measurement: str,
+    unit=None,
+    scale=None,
+    sampling_interval=None,
+    max_sampling_interval=None,
+  ):
+    """
+    Inserts or updates a report stream.
+
+    Parameters
+    ----------
+    stream_id : int
+        The compact id of the stream.
+    ven_id : str
+        The ID of the VEN.
+    resource_id : str
+        The ID of the resource.
+    measurement : str
+        The type of measurement.
+    unit : str, optional
+        The unit of measurement.
+    scale : str, optional
+        The scale of measurement.
+    sampling_interval : float, optional
+        The negotiated sampling interval in seconds.
+    max_sampling_interval : float, optional
+        The longest sampling interval in seconds the VEN offered.
+    """
+    raise NotImplementedError
+
+  def fetch_streams(self):
+    """
+    Retrieves all report streams ordered by stream id.
+
+    Returns
+    -------
+    list of tuple
+        (stream_id, ven_id, resource_id, measurement, unit, scale,
+        sampling_interval, max_sampling_interval) tuples.
+    """
+    raise NotImplementedError
+
+  def save_report_binding(self, report_request_id: str, r_id: str, stream_id: int):
+    """
+    Inserts or updates the stream a report request of a VEN delivers data for.
+
+    A stream is bound to one report request at a time: a VEN that registers its
+    reports again gets new report requests, so the binding replaces any earlier
+    binding of the stream.
+
+    Parameters
+    ----------
+    report_request_id : str
+        The reportRequestID the VTN assigned when the report was registered.
+    r_id : str
+        The rID of the report description within the report request.
+    stream_id : int
+        The compact id of the stream.
+    """
+    raise NotImplementedError
+
+  def fetch_report_bindings(self):
+    """
+    Retrieves all report bindings.
+
+    Returns
+    -------
+    list of tuple
+        (report_request_id, r_id, stream_id) tuples.
+    """
+    raise NotImplementedError
+
+  def close(self):
+    """Releases the resources held by the backend."""
+
+
+def replace_binding(bindings: dict, key: tuple, stream_id: int):
+  """
+  Binds a (report_request_id, r_id) key to a stream in a dict of bindings,
+  removing the earlier bindings of the stream.
+  """
+  for old_key in [old for old, bound in bindings.items() if bound == stream_id]:
+    del bindings[old_key]
+  bindings[key] = stream_id
+
+
+def is_offset(value) -> bool:
+  """Returns whether a value is a non-negative integer, excluding booleans."""
+  return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+
+def to_timestamp(time) -> float:
+  """
+  Converts a stored time, a datetime or an ISO 8601 string, to a POSIX timestamp.
+  """
+  if isinstance(time, str):
+    time = datetime.fromisoformat(time)
+  if time.tzinfo is None:
+    time = time.replace(tzinfo=UTC)
+  return time.timestamp()
+
+
+def decode_value_row(time, value) -> tuple:
+  """
+  Converts a stored meter value to the (datetime, float) row the backends return.
+
+  Times stored as ISO 8601 strings are parsed and values stored as text are
+  converted to float. Anything that cannot be converted is returned as stored.
+  """
+  if isinstance(time, str):
+    try:
+      time = datetime.fromisoformat(time)
+    except ValueError:
+      pass
+  if not isinstance(value, float):
+    try:
+      value = float(value)
+    except (TypeError, ValueError):
+      pass
+  return time, value
+
+
+def bucket_values(rows, resolution: int) -> list:
+  """
+  Averages time ordered (time, value) rows per bucket of `resolution` seconds.
+
+  Returns
+  -------
+  list of tuple
+      (bucket start, mean value) tuples, the bucket start as UTC datetime.
+  """
+  buckets = []
+  current, total, count = None, 0.0, 0
+  for time, value in rows:
+    bucket = int(to_timestamp(time) // resolution * resolution)
+    if bucket != current:
+      if count:
+        buckets.append((datetime.fromtimestamp(current, tz=UTC), total / count))
+      current, total, count = bucket, 0.0, 0
+    total += float(value)
+    count += 1
+  if count:
+    buckets.append((datetime.fromtimestamp(current, tz=UTC), total / count))
+  return buckets
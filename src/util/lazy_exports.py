@@ -0,0 +1,33 @@
+import importlib
+
+
+def lazy_exports(namespace: dict, exports: dict):
+  """
+  Returns a module `__getattr__` that imports exported names on first access.
+
+  Lets a package list names in `__all__` without importing the modules behind
+  them, so that importing the package does not pull in their dependencies. A
+  resolved name is stored in the package, so it is only looked up once.
+
+  Parameters
+  ----------
+  namespace : dict
+      The `globals()` of the package.
+  exports : dict
+      Mapping of exported names to the relative module defining them.
+
+  Returns
+  -------
+  callable
+      The `__getattr__` to assign in the package.
+  """
+  package = namespace['__name__']
+
+  def __getattr__(name):
+    if name not in exports:
+      raise AttributeError(f'module {package!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(exports[name], package), name)
+    namespace[name] = value
+    return value
+
+  return __getattr__
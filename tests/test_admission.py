@@ -0,0 +1,62 @@
+from src.server.admission import AdmissionController
+
+
+class FakeClock:
+  def __init__(self):
+    self.now = 0.0
+
+  def __call__(self):
+    return self.now
+
+
+def test_admits_a_burst_then_rejects():
+  admission = AdmissionController(
+    rate=1.0, burst=3, max_concurrent=10, clock=FakeClock()
+  )
+
+  admitted = [admission.try_acquire() for _ in range(4)]
+
+  assert admitted == [True, True, True, False]
+  assert admission.rejected == 1
+  assert admission.in_flight == 3
+
+
+def test_tokens_refill_at_the_rate_up_to_the_burst():
+  clock = FakeClock()
+  admission = AdmissionController(rate=2.0, burst=2, max_concurrent=10, clock=clock)
+  for _ in range(2):
+    assert admission.try_acquire()
+  assert not admission.try_acquire()
+
+  clock.now += 0.5
+  assert admission.try_acquire()
+  assert not admission.try_acquire()
+
+  clock.now += 100
+  assert [admission.try_acquire() for _ in range(3)] == [True, True, False]
+
+
+def test_limits_requests_in_flight():
+  admission = AdmissionController(
+    rate=100.0, burst=100, max_concurrent=2, clock=FakeClock()
+  )
+
+  assert admission.try_acquire()
+  assert admission.try_acquire()
+  assert not admission.try_acquire()
+
+  admission.release()
+  assert admission.try_acquire()
+
+
+def test_retry_after_is_the_time_to_the_next_token():
+  clock = FakeClock()
+  admission = AdmissionController(rate=0.25, burst=1, max_concurrent=10, clock=clock)
+  assert admission.retry_after() == 1
+
+  admission.try_acquire()
+  assert admission.retry_after() == 4
+
+  clock.now += 2
+  admission.try_acquire()
+  assert admission.retry_after() == 2
@@ -0,0 +1,145 @@
+import asyncio
+import inspect
+import time
+
+import pytest
+
+web = pytest.importorskip('aiohttp.web')
+test_utils = pytest.importorskip('aiohttp.test_utils')
+
+from src.diagnostics import Diagnostics, HandlerTimings, LoopWatchdog, Profiler
+
+
+def test_wrapped_calls_are_counted_and_the_slowest_kept():
+  timings = HandlerTimings(slowest=2)
+  durations = iter([0.0, 0.03, 0.01, 0.02])
+
+  def handler(ven_id, rows):
+    time.sleep(next(durations))
+    if ven_id == 'ven-3':
+      raise ValueError(ven_id)
+
+  wrapped = timings.wrap('handler', handler)
+  for index in range(4):
+    try:
+      wrapped(f'ven-{index}', [0] * index)
+    except ValueError:
+      pass
+
+  stats = timings.snapshot()['handler']
+  assert (stats['count'], stats['errors']) == (4, 1)
+  assert stats['max'] >= 0.03
+  assert [entry['arguments'] for entry in stats['slowest']] == [
+    {'ven_id': 'ven-1', 'rows': {'len': 1}},
+    {'ven_id': 'ven-3', 'rows': {'len': 3}},
+  ]
+
+
+def test_wrapped_coroutines_keep_their_signature():
+  timings = HandlerTimings()
+
+  async def handler(ven_id: str, report: dict):
+    return ven_id
+
+  wrapped = timings.wrap('handler', handler)
+
+  assert inspect.iscoroutinefunction(wrapped)
+  assert inspect.signature(wrapped) == inspect.signature(handler)
+  assert asyncio.run(wrapped('ven-1', {})) == 'ven-1'
+  assert timings.snapshot()['handler']['count'] == 1
+
+
+def test_a_broken_describer_does_not_fail_the_handler():
+  timings = HandlerTimings()
+
+  def describe(value):
+    raise KeyError(value)
+
+  assert timings.wrap('handler', lambda value: value * 2, describe)(21) == 42
+  (entry,) = timings.snapshot()['handler']['slowest']
+  assert 'KeyError' in entry['arguments']['error']
+
+
+def test_reset_clears_the_timings():
+  timings = HandlerTimings()
+  timings.record('http GET /', 0.5)
+
+  timings.reset()
+
+  assert timings.snapshot()['http GET /'] == {
+    'count': 0,
+    'errors': 0,
+    'mean': 0.0,
+    'max': 0.0,
+    'slowest': [],
+  }
+
+
+def blocking_callback():
+  time.sleep(0.3)
+
+
+def test_the_watchdog_captures_a_blocked_loop():
+  watchdog = LoopWatchdog(threshold=0.1, interval=0.02)
+
+  async def block():
+    task = asyncio.create_task(watchdog.run())
+    await asyncio.sleep(0.05)
+    blocking_callback()
+    await asyncio.sleep(0.05)
+    task.cancel()
+
+  asyncio.run(block())
+
+  snapshot = watchdog.snapshot()
+  assert snapshot['count'] == 1
+  (stall,) = snapshot['recent']
+  assert stall['seconds'] >= 0.1
+  assert any('blocking_callback' in line for line in stall['stack'])
+
+
+def test_profiles_are_saved_and_summarized(tmp_path):
+  profiler = Profiler(tmp_path, max_seconds=1.0)
+
+  result = asyncio.run(profiler.capture(0.05))
+
+  assert result['engine'] == 'cprofile'
+  assert (tmp_path / result['path'].rsplit('/', 1)[-1]).exists()
+  assert 'cumulative' in result['summary']
+  assert not profiler.capturing
+
+
+@pytest.mark.parametrize(
+  ('seconds', 'engine'), [(0, 'cprofile'), (2, 'cprofile'), (1, 'gprof')]
+)
+def test_invalid_profiles_are_rejected(tmp_path, seconds, engine):
+  with pytest.raises(ValueError):
+    asyncio.run(Profiler(tmp_path, max_seconds=1.0).capture(seconds, engine))
+
+
+def test_routes_are_only_served_on_the_admin_app(tmp_path):
+  diagnostics = Diagnostics(profile_dir=str(tmp_path))
+  app = web.Application()
+  admin_app = web.Application()
+
+  async def hello(request):
+    return web.Response(text='hello')
+
+  app.add_routes([web.get('/hello', hello)])
+  diagnostics.setup(app, admin_app)
+
+  async def request():
+    async with (
+      test_utils.TestClient(test_utils.TestServer(app)) as client,
+      test_utils.TestClient(test_utils.TestServer(admin_app)) as admin,
+    ):
+      assert (await client.get('/hello')).status == 200
+      assert (await client.get('/diagnostics')).status == 404
+      response = await admin.get('/diagnostics')
+      assert response.status == 200
+      return await response.json()
+
+  report = asyncio.run(request())
+
+  assert report['handlers']['http GET /hello']['count'] == 1
+  assert 'http GET /diagnostics' not in report['handlers']
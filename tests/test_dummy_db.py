@@ -0,0 +1,87 @@
+import asyncio
+import itertools
+from datetime import timedelta
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from src.live_charting.dummy_db import PROFILES, DataGenerator
+
+
+@pytest.fixture
+def make_generator(tmp_path):
+  generators = []
+
+  def make(**kwargs):
+    kwargs = {
+      'db_name': str(tmp_path / 'test.db'),
+      'storage_backend': 'memory',
+      'seed': 0,
+      **kwargs,
+    }
+    generator = DataGenerator(**kwargs)
+    generator.storage.create_table()
+    generators.append(generator)
+    return generator
+
+  yield make
+  for generator in generators:
+    generator.close()
+
+
+def test_batches_hold_the_same_samples_for_every_ven(make_generator):
+  generator = make_generator(ven_count=7, batch_size=100)
+
+  times, values = generator.generate_batch()
+
+  assert generator.steps_per_batch == 14
+  assert generator.batch_size == 98
+  assert len(times) == 14
+  assert values.shape == (14, 7)
+
+
+def test_simulated_time_advances_by_the_sample_interval(make_generator):
+  generator = make_generator(ven_count=2, batch_size=10, sample_interval=60.0)
+
+  first, _ = generator.generate_batch()
+  second, _ = generator.generate_batch()
+  times = first + second
+
+  assert {b - a for a, b in itertools.pairwise(times)} == {timedelta(seconds=60)}
+
+
+def test_dips_drop_below_the_event_threshold(make_generator):
+  generator = make_generator(
+    ven_count=50, batch_size=50_000, dip_probability=0.01, dip_length=5
+  )
+  threshold = PROFILES['voltage']['threshold']
+
+  _, values = generator.generate_batch()
+  below = values < threshold
+
+  assert below.any()
+  # Outside of dips the trace stays well above the threshold.
+  assert values[~below].min() > threshold + 10
+  # Every dip lasts at least `dip_length` samples, unless it runs past the batch.
+  for column in below.T:
+    runs = np.diff(np.flatnonzero(np.diff(np.r_[0, column.astype(int), 0])))[::2]
+    assert (runs[:-1] >= 5).all()
+
+
+def test_no_dips_without_dip_probability(make_generator):
+  generator = make_generator(ven_count=10, batch_size=10_000, dip_probability=0.0)
+
+  _, values = generator.generate_batch()
+
+  assert (values > PROFILES['voltage']['threshold']).all()
+
+
+def test_generated_rows_reach_the_storage(make_generator):
+  generator = make_generator(ven_count=3, batch_size=30, rows_per_second=1e9)
+
+  result = asyncio.run(generator.generate_data(duration=0.05))
+
+  rows = generator.storage.fetch_values(generator.ven_ids[0])
+  assert result['rows'] > 0
+  assert len(rows) == result['rows'] // 3
@@ -0,0 +1,125 @@
+import math
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+pytest.importorskip('openleadr')
+
+from src.server.event_scheduler import EventScheduler
+from src.server.report_stats import ReportStatistics
+
+T0 = datetime(2026, 1, 1, tzinfo=UTC)
+
+
+class RecordingServer:
+  """Stands in for OpenADRServer and keeps the events it receives."""
+
+  def __init__(self):
+    self.events = []
+
+  def add_event(self, **kwargs):
+    self.events.append(kwargs)
+
+
+def make_scheduler(loads, seen=T0, **kwargs):
+  """Returns a scheduler over VENs that reported `loads` at `seen`."""
+  report_stats = ReportStatistics()
+  for ven_id, load in loads.items():
+    stream_id = report_stats.stream_id(ven_id, 'meter', 'RealPower')
+    report_stats.update(stream_id, seen, load)
+  return EventScheduler(RecordingServer(), report_stats, max_age=None, **kwargs)
+
+
+def test_targets_are_split_in_proportion_to_the_load():
+  scheduler = make_scheduler({'ven-1': 30.0, 'ven-2': 10.0})
+
+  assignments = scheduler.assign(['ven-1', 'ven-2'], 20.0)
+
+  assert assignments == pytest.approx({'ven-1': 15.0, 'ven-2': 5.0})
+
+
+def test_latest_load_sums_the_dispatch_measurement_only():
+  scheduler = make_scheduler({'ven-1': 4.0})
+  report_stats = scheduler.report_stats
+  report_stats.update(report_stats.stream_id('ven-1', 'battery', 'RealPower'), T0, 6.0)
+  report_stats.update(report_stats.stream_id('ven-1', 'meter', 'voltage'), T0, 230.0)
+
+  assert scheduler.latest_load('ven-1') == 10.0
+  assert math.isnan(scheduler.latest_load('ven-2'))
+
+
+def test_targets_above_the_fleet_load_shed_everything():
+  scheduler = make_scheduler({'ven-1': 3.0, 'ven-2': 1.0})
+
+  assignments = scheduler.assign(['ven-1', 'ven-2'], 100.0)
+
+  assert assignments == pytest.approx({'ven-1': 3.0, 'ven-2': 1.0})
+
+
+def test_stale_readings_are_not_counted_as_load():
+  now = datetime.now(tz=UTC)
+  scheduler = make_scheduler({'ven-1': 10.0}, seen=now)
+  report_stats = scheduler.report_stats
+  stale = report_stats.stream_id('ven-2', 'meter', 'RealPower')
+  report_stats.update(stale, now - timedelta(hours=1), 10.0)
+  scheduler.max_age = 60.0
+
+  assert math.isnan(scheduler.latest_load('ven-2'))
+  assert scheduler.assign(['ven-1', 'ven-2'], 5.0) == {'ven-1': 5.0}
+
+
+def test_events_are_dispatched_lead_time_before_the_start():
+  scheduler = make_scheduler(
+    {'ven-1': 10.0, 'ven-2': 10.0}, lead_time=timedelta(minutes=5)
+  )
+  scheduler.add_to_group('north', 'ven-1')
+  start = T0 + timedelta(hours=1)
+
+  assert scheduler.schedule_shed(4.0, start, start + timedelta(hours=1), 'north') == {
+    'ven-1': 4.0
+  }
+  assert len(scheduler) == 1
+
+  assert scheduler.dispatch_due(now=start - timedelta(minutes=6)) == 0
+  assert scheduler.dispatch_due(now=start - timedelta(minutes=5)) == 1
+  assert len(scheduler) == 0
+
+  (event,) = scheduler.server.events
+  assert event['ven_id'] == 'ven-1'
+  (interval,) = event['intervals']
+  assert interval.dtstart == start
+  assert interval.signal_payload == -4.0
+
+
+def test_due_events_are_dispatched_in_time_order():
+  scheduler = make_scheduler({'ven-1': 10.0, 'ven-2': 10.0})
+  scheduler.add_to_group('one', 'ven-1')
+  scheduler.add_to_group('two', 'ven-2')
+  later = T0 + timedelta(hours=2)
+  scheduler.schedule_shed(1.0, later, later + timedelta(hours=1), 'one')
+  scheduler.schedule_shed(1.0, T0, T0 + timedelta(hours=1), 'two')
+
+  scheduler.dispatch_due(now=later)
+
+  assert [event['ven_id'] for event in scheduler.server.events] == ['ven-2', 'ven-1']
+
+
+def test_groups_can_be_edited():
+  scheduler = make_scheduler({})
+  scheduler.add_to_group('north', 'ven-1', 'ven-2')
+  scheduler.remove_from_group('north', 'ven-1')
+  scheduler.remove_from_group('south', 'ven-3')
+
+  assert scheduler.groups == {'north': {'ven-2'}}
+
+
+@pytest.mark.parametrize(
+  ('start', 'end', 'group'),
+  [(T0, T0, None), (T0, T0 + timedelta(hours=1), 'unknown')],
+)
+def test_invalid_targets_are_rejected(start, end, group):
+  scheduler = make_scheduler({'ven-1': 10.0})
+
+  with pytest.raises(ValueError):
+    scheduler.schedule_shed(1.0, start, end, group)
+  assert len(scheduler) == 0
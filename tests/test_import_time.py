@@ -0,0 +1,33 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from src.benchmarks.import_time import HEAVY_MODULES, measure
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+@pytest.mark.parametrize('package', ['src.client', 'src.server', 'src.live_charting'])
+def test_importing_a_package_defers_its_dependencies(package):
+  heavy = (*HEAVY_MODULES, 'openleadr')
+  probe = f'import sys, {package}\nprint(*(m for m in {heavy!r} if m in sys.modules))'
+  output = subprocess.run(
+    [sys.executable, '-c', probe],
+    cwd=ROOT,
+    check=True,
+    capture_output=True,
+    text=True,
+  ).stdout
+
+  assert output.strip() == ''
+
+
+@pytest.mark.parametrize('roles', ['vtn', 'ven', 'vtn,ven'])
+def test_roles_without_charts_do_not_import_chart_dependencies(roles):
+  pytest.importorskip('openleadr')
+  pytest.importorskip('dotenv')
+  pytest.importorskip('dependency_injector')
+
+  assert measure(roles, repeat=1)['heavy'] == []
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import struct
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from src.storage import create_storage
+
+web = pytest.importorskip('aiohttp.web')
+test_utils = pytest.importorskip('aiohttp.test_utils')
+
+from src.server.query_api import (
+  DATA_FRAME_MAGIC,
+  END_FRAME_MAGIC,
+  FRAME_HEADER,
+  QueryService,
+)
+
+T0 = datetime(2026, 1, 1, tzinfo=UTC)
+
+
+@pytest.fixture(params=['sqlite', 'memory', 'log'])
+def storage(request, tmp_path):
+  storage = create_storage(request.param, str(tmp_path / 'db' / 'test.db'))
+  storage.create_table()
+  storage.store_many_values(
+    [('ven-1', T0 + timedelta(seconds=second), float(second)) for second in range(25)]
+  )
+  yield storage
+  storage.close()
+
+
+def get(storage, path, chunk_size=4):
+  """Requests `path` from a QueryService and returns the status and body."""
+
+  async def request():
+    app = web.Application()
+    QueryService(storage, chunk_size=chunk_size).setup(app)
+    async with test_utils.TestClient(test_utils.TestServer(app)) as client:
+      response = await client.get(path)
+      return response.status, await response.read()
+
+  return asyncio.run(request())
+
+
+def read_ndjson(body):
+  lines = [json.loads(line) for line in body.decode().splitlines()]
+  return lines[:-1], lines[-1]['next_cursor']
+
+
+def test_ndjson_pages_follow_the_cursor(storage):
+  status, body = get(storage, '/vens/ven-1/values?limit=10')
+  rows, cursor = read_ndjson(body)
+  values = [row['value'] for row in rows]
+  while cursor is not None:
+    status, body = get(storage, f'/vens/ven-1/values?limit=10&cursor={cursor}')
+    rows, cursor = read_ndjson(body)
+    values.extend(row['value'] for row in rows)
+
+  assert status == 200
+  assert values == [float(second) for second in range(25)]
+
+
+def test_ndjson_range_and_resolution(storage):
+  status, body = get(
+    storage,
+    '/vens/ven-1/values?from=2026-01-01T00:00:10Z&to=2026-01-01T00:00:20Z&resolution=5',
+  )
+
+  rows, cursor = read_ndjson(body)
+  assert status == 200
+  assert rows == [
+    {'time': '2026-01-01T00:00:10+00:00', 'value': 12.0},
+    {'time': '2026-01-01T00:00:15+00:00', 'value': 17.0},
+  ]
+  assert cursor is None
+
+
+def test_columnar_frames(storage):
+  status, body = get(storage, '/vens/ven-1/values?limit=6&format=columnar')
+
+  values, offset = [], 0
+  while True:
+    magic, count = FRAME_HEADER.unpack_from(body, offset)
+    offset += FRAME_HEADER.size
+    if magic == END_FRAME_MAGIC:
+      trailer = json.loads(body[offset : offset + count])
+      break
+    assert magic == DATA_FRAME_MAGIC
+    times = struct.unpack_from(f'<{count}d', body, offset)
+    values.extend(struct.unpack_from(f'<{count}d', body, offset + 8 * count))
+    assert times[0] >= T0.timestamp()
+    offset += 16 * count
+
+  assert status == 200
+  assert values == [float(second) for second in range(6)]
+  assert trailer['next_cursor'] is not None
+
+
+@pytest.mark.parametrize(
+  'query',
+  [
+    'cursor=not-base64!',
+    'cursor=eyJhIjogMX0=',
+    'from=yesterday',
+    'limit=0',
+    'resolution=abc',
+    'format=xml',
+  ],
+)
+def test_invalid_parameters_are_rejected(storage, query):
+  status, _ = get(storage, f'/vens/ven-1/values?{query}')
+
+  assert status == 400
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from src.server.registration_writer import RegistrationWriter
+
+
+class RecordingStorage:
+  """Keeps the batches passed to update_vens, optionally failing them."""
+
+  def __init__(self, error=None):
+    self.batches = []
+    self.error = error
+
+  def update_vens(self, rows):
+    self.batches.append(list(rows))
+    if self.error is not None:
+      raise self.error
+
+
+def update_all(writer, count):
+  async def update():
+    await asyncio.gather(
+      *(
+        writer.update_ven(f'ven{index}', f'id{index}', f'reg{index}')
+        for index in range(count)
+      )
+    )
+
+  asyncio.run(update())
+
+
+def test_concurrent_updates_share_one_commit():
+  storage = RecordingStorage()
+
+  update_all(RegistrationWriter(storage, max_delay=0.01), 5)
+
+  assert storage.batches == [[(f'ven{i}', f'id{i}', f'reg{i}') for i in range(5)]]
+
+
+def test_full_batches_are_committed_without_waiting():
+  storage = RecordingStorage()
+
+  # The delay is far longer than the test, so only full batches commit early.
+  update_all(RegistrationWriter(storage, max_batch=2, max_delay=60), 4)
+
+  assert [len(batch) for batch in storage.batches] == [2, 2]
+
+
+def test_a_failed_commit_fails_every_waiting_update():
+  storage = RecordingStorage(error=OSError('disk full'))
+  writer = RegistrationWriter(storage, max_delay=0.01)
+
+  async def update():
+    return await asyncio.gather(
+      writer.update_ven('ven0', 'id0', 'reg0'),
+      writer.update_ven('ven1', 'id1', 'reg1'),
+      return_exceptions=True,
+    )
+
+  results = asyncio.run(update())
+
+  assert len(storage.batches) == 1
+  assert all(isinstance(result, OSError) for result in results)
+
+
+def test_flush_without_pending_rows_does_nothing():
+  storage = RecordingStorage()
+
+  RegistrationWriter(storage).flush()
+
+  assert storage.batches == []
+
+
+@pytest.mark.parametrize('max_batch', [1, 3])
+def test_every_update_is_committed_once(max_batch):
+  storage = RecordingStorage()
+
+  update_all(RegistrationWriter(storage, max_batch=max_batch, max_delay=0.01), 7)
+
+  rows = [row for batch in storage.batches for row in batch]
+  assert sorted(rows) == sorted((f'ven{i}', f'id{i}', f'reg{i}') for i in range(7))
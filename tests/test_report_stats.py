@@ -0,0 +1,110 @@
+import itertools
+import math
+import statistics
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+from src.server.report_stats import ReportStatistics
+
+T0 = datetime(2026, 1, 1, tzinfo=UTC)
+
+
+def test_stream_ids_are_dense_and_stable():
+  stats = ReportStatistics()
+
+  first = stats.stream_id('ven-1', 'meter', 'voltage')
+  second = stats.stream_id('ven-1', 'meter', 'power')
+
+  assert (first, second) == (0, 1)
+  assert stats.stream_id('ven-1', 'meter', 'voltage') == 0
+  assert stats.key(1) == ('ven-1', 'meter', 'power')
+  assert stats.ven_stream_ids('ven-1') == [0, 1]
+  assert len(stats) == 2
+
+
+def test_mean_and_stddev_match_the_sample_statistics():
+  stats = ReportStatistics()
+  stream_id = stats.stream_id('ven-1', 'meter', 'voltage')
+  values = [229.0, 231.5, 230.2, 228.7, 232.1, 230.0]
+
+  for second, value in enumerate(values):
+    stats.update(stream_id, T0 + timedelta(seconds=second), value)
+
+  snapshot = stats.snapshot(stream_id)
+  assert snapshot['count'] == len(values)
+  assert snapshot['mean'] == pytest.approx(statistics.mean(values))
+  assert snapshot['stddev'] == pytest.approx(statistics.stdev(values))
+  assert (snapshot['min'], snapshot['max']) == (min(values), max(values))
+  assert snapshot['last_value'] == values[-1]
+  assert snapshot['last_seen'] == T0 + timedelta(seconds=len(values) - 1)
+
+
+def test_ewma_starts_at_the_first_value():
+  stats = ReportStatistics(ewma_alpha=0.5)
+  stream_id = stats.stream_id('ven-1', 'meter', 'voltage')
+
+  stats.update(stream_id, T0, 10.0)
+  assert stats.ewma(stream_id) == 10.0
+
+  stats.update(stream_id, T0 + timedelta(seconds=1), 20.0)
+  stats.update(stream_id, T0 + timedelta(seconds=2), 20.0)
+  assert stats.ewma(stream_id) == pytest.approx(17.5)
+
+
+def test_interval_mean_and_jitter():
+  stats = ReportStatistics()
+  stream_id = stats.stream_id('ven-1', 'meter', 'voltage')
+  seconds = [0, 10, 20, 32, 40]
+
+  for second in seconds:
+    stats.update(stream_id, T0.timestamp() + second, 1.0)
+
+  intervals = [b - a for a, b in itertools.pairwise(seconds)]
+  snapshot = stats.snapshot(stream_id)
+  assert snapshot['interval_mean'] == pytest.approx(statistics.mean(intervals))
+  assert snapshot['jitter'] == pytest.approx(statistics.stdev(intervals))
+
+
+def test_new_stream_has_empty_snapshot():
+  stats = ReportStatistics()
+  stream_id = stats.stream_id('ven-1', 'meter', 'voltage')
+
+  snapshot = stats.snapshot(stream_id)
+
+  assert snapshot['count'] == 0
+  assert snapshot['mean'] is None
+  assert snapshot['stddev'] == 0.0
+  assert math.isnan(stats.last_value(stream_id))
+  assert stats.zscore(stream_id, 5.0) == 0.0
+
+
+def test_zscore():
+  stats = ReportStatistics()
+  stream_id = stats.stream_id('ven-1', 'meter', 'voltage')
+  for second, value in enumerate([1.0, 2.0, 3.0]):
+    stats.update(stream_id, second, value)
+
+  assert stats.zscore(stream_id, 4.0) == pytest.approx(2.0)
+
+
+def test_add_stream_requires_dense_matching_ids():
+  stats = ReportStatistics()
+
+  assert stats.add_stream(0, 'ven-1', 'meter', 'voltage') == 0
+  assert stats.add_stream(0, 'ven-1', 'meter', 'voltage') == 0
+  with pytest.raises(ValueError):
+    stats.add_stream(0, 'ven-2', 'meter', 'voltage')
+  with pytest.raises(ValueError):
+    stats.add_stream(2, 'ven-1', 'meter', 'power')
+
+
+def test_stale_streams_skip_streams_that_never_reported():
+  stats = ReportStatistics()
+  stale = stats.stream_id('ven-1', 'meter', 'voltage')
+  fresh = stats.stream_id('ven-2', 'meter', 'voltage')
+  stats.stream_id('ven-3', 'meter', 'voltage')
+  stats.update(stale, T0, 1.0)
+  stats.update(fresh, T0 + timedelta(minutes=10), 1.0)
+
+  assert stats.stale_streams(300, now=T0 + timedelta(minutes=11)) == [stale]
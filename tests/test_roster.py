@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from src.storage.roster import load_roster
+
+
+def test_csv_rosters_read_names_and_optional_ids(tmp_path):
+  path = tmp_path / 'roster.csv'
+  path.write_text('name,ven_id,registration_id\nven-a,id-a,reg-a\nven-b,,\n')
+
+  assert load_roster(str(path)) == [('ven-a', 'id-a', 'reg-a'), ('ven-b', None, None)]
+
+
+def test_csv_rosters_accept_a_ven_name_column(tmp_path):
+  path = tmp_path / 'roster.CSV'
+  path.write_text('ven_name\nven-a\n')
+
+  assert load_roster(str(path)) == [('ven-a', None, None)]
+
+
+def test_json_rosters_mix_names_and_objects(tmp_path):
+  path = tmp_path / 'roster.json'
+  path.write_text(json.dumps(['ven-a', {'ven_name': 'ven-b', 'ven_id': 'id-b'}]))
+
+  assert load_roster(str(path)) == [('ven-a', None, None), ('ven-b', 'id-b', None)]
+
+
+@pytest.mark.parametrize(
+  ('filename', 'content', 'message'),
+  [
+    ('roster.txt', 'ven-a\n', 'Unsupported roster file'),
+    ('roster.csv', 'name,ven_id\n,id-a\n', 'entry 1'),
+    ('roster.json', json.dumps(['ven-a', {'ven_id': 'id-b'}]), 'entry 2'),
+  ],
+)
+def test_invalid_rosters_are_rejected(tmp_path, filename, content, message):
+  path = tmp_path / filename
+  path.write_text(content)
+
+  with pytest.raises(ValueError, match=message):
+    load_roster(str(path))
@@ -0,0 +1,76 @@
+import asyncio
+from datetime import timedelta
+
+from src.server.sampling_governor import SamplingGovernor
+
+
+def overloaded_governor(**kwargs):
+  queue = asyncio.Queue()
+  governor = SamplingGovernor(queue, max_queue_depth=10, **kwargs)
+  for item in range(10):
+    queue.put_nowait(item)
+  return governor
+
+
+def track(governor, stream_id, ven_id, seconds, max_seconds=3600):
+  governor.track(
+    stream_id,
+    ven_id,
+    timedelta(seconds=seconds),
+    None if max_seconds is None else timedelta(seconds=max_seconds),
+  )
+
+
+def test_load_is_the_larger_of_queue_depth_and_loop_lag():
+  governor = SamplingGovernor(asyncio.Queue(), max_queue_depth=10, max_loop_lag=0.2)
+  assert governor.load == 0.0
+
+  governor.queue.put_nowait(1)
+  governor.record_lag(1.0)
+
+  assert governor.load == min(governor.loop_lag / 0.2, 1.0)
+  assert governor.load > 0.1
+
+
+def test_downgrades_the_fastest_streams_first():
+  governor = overloaded_governor(downgrade_batch=2)
+  track(governor, 0, 'ven-slow', 60)
+  track(governor, 1, 'ven-fast', 1)
+  track(governor, 2, 'ven-medium', 10)
+  track(governor, 3, 'ven-fixed', 1, max_seconds=None)
+
+  assert governor.downgrade(now=0.0) == ['ven-fast', 'ven-medium']
+
+
+def test_does_nothing_below_the_threshold_or_during_the_cooldown():
+  governor = SamplingGovernor(asyncio.Queue(), max_queue_depth=10)
+  track(governor, 0, 'ven-1', 1)
+  assert governor.downgrade(now=0.0) == []
+
+  governor = overloaded_governor(downgrade_batch=1, downgrade_cooldown=60.0)
+  track(governor, 0, 'ven-1', 1)
+  track(governor, 1, 'ven-2', 2)
+  assert governor.downgrade(now=0.0) == ['ven-1']
+  assert governor.downgrade(now=30.0) == []
+  assert governor.downgrade(now=61.0) == ['ven-2']
+
+
+def test_skips_streams_renegotiated_since_they_were_queued():
+  governor = overloaded_governor()
+  track(governor, 0, 'ven-1', 1)
+  track(governor, 0, 'ven-1', 3600)
+
+  assert governor.downgrade(now=0.0) == []
+
+
+def test_reregistration_handshake():
+  governor = overloaded_governor()
+  track(governor, 0, 'ven-1', 1)
+  governor.downgrade(now=0.0)
+
+  assert not governor.complete_reregistration('ven-1')
+  assert governor.take_reregistration('ven-1')
+  assert not governor.take_reregistration('ven-1')
+  assert governor.complete_reregistration('ven-1')
+  assert not governor.complete_reregistration('ven-1')
+  assert not governor.take_reregistration('ven-2')
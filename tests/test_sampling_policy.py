@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from src.server.sampling_policy import SamplingPolicy
+
+
+def test_load_policy_rounds_within_the_offered_range():
+  policy = SamplingPolicy('load')
+  low, high = timedelta(seconds=1.4), timedelta(seconds=1.6)
+
+  assert low <= policy.choose(low, high, 0.0) <= high
+  assert low <= policy.choose(low, high, 1.0) <= high
+  assert policy.choose(timedelta(seconds=10), timedelta(seconds=20), 0.5) == timedelta(
+    seconds=15
+  )
+
+
+def test_min_and_max_policies():
+  low, high = timedelta(seconds=10), timedelta(seconds=60)
+
+  assert SamplingPolicy('min').choose(low, high, 1.0) == low
+  assert SamplingPolicy('max').choose(low, high, 0.0) == high
+  assert SamplingPolicy('max').choose(low, None, 0.0) == low
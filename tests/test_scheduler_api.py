@@ -0,0 +1,120 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
+
+import pytest
+
+web = pytest.importorskip('aiohttp.web')
+test_utils = pytest.importorskip('aiohttp.test_utils')
+pytest.importorskip('openleadr')
+
+from src.server.event_scheduler import EventScheduler
+from src.server.report_stats import ReportStatistics
+from src.server.scheduler_api import SchedulerService
+
+START = datetime(2026, 1, 1, tzinfo=UTC)
+
+
+class RecordingServer:
+  def __init__(self):
+    self.events = []
+
+  def add_event(self, **kwargs):
+    self.events.append(kwargs)
+
+
+@pytest.fixture
+def scheduler():
+  report_stats = ReportStatistics()
+  for ven_id, load in [('ven-1', 30.0), ('ven-2', 10.0)]:
+    report_stats.update(
+      report_stats.stream_id(ven_id, 'meter', 'RealPower'), START, load
+    )
+  return EventScheduler(RecordingServer(), report_stats, max_age=None)
+
+
+def post(scheduler, *requests):
+  """Sends (path, json) POST requests and returns their statuses and bodies."""
+
+  async def send():
+    app = web.Application()
+    SchedulerService(scheduler).setup(app)
+    results = []
+    async with test_utils.TestClient(test_utils.TestServer(app)) as client:
+      for path, body in requests:
+        response = await client.post(path, json=body)
+        content_type = response.content_type
+        results.append(
+          (
+            response.status,
+            await response.json()
+            if content_type == 'application/json'
+            else await response.text(),
+          )
+        )
+      response = await client.get('/groups')
+      results.append((response.status, await response.json()))
+    return results
+
+  return asyncio.run(send())
+
+
+def test_groups_are_edited_over_http(scheduler):
+  added, removed, groups = post(
+    scheduler,
+    ('/groups/north', {'add': ['ven-1', 'ven-2']}),
+    ('/groups/north', {'remove': ['ven-1']}),
+  )
+
+  assert added == (200, {'group': 'north', 'ven_ids': ['ven-1', 'ven-2']})
+  assert removed == (200, {'group': 'north', 'ven_ids': ['ven-2']})
+  assert groups == (200, {'north': ['ven-2']})
+
+
+def test_shed_targets_are_scheduled_over_http(scheduler):
+  end = START + timedelta(hours=1)
+  _, shed, _ = post(
+    scheduler,
+    ('/groups/fleet', {'add': ['ven-1', 'ven-2']}),
+    (
+      '/shed',
+      {
+        'shed_kw': 20,
+        'start': START.isoformat(),
+        'end': end.isoformat(),
+        'group': 'fleet',
+      },
+    ),
+  )
+
+  assert shed == (200, {'assignments': {'ven-1': 15.0, 'ven-2': 5.0}})
+  assert len(scheduler) == 2
+
+
+@pytest.mark.parametrize(
+  'body',
+  [
+    {'shed_kw': -1, 'start': '2026-01-01T00:00', 'end': '2026-01-01T01:00'},
+    {'shed_kw': True, 'start': '2026-01-01T00:00', 'end': '2026-01-01T01:00'},
+    {'shed_kw': 1, 'start': 'noon', 'end': '2026-01-01T01:00'},
+    {'shed_kw': 1, 'start': '2026-01-01T01:00', 'end': '2026-01-01T00:00'},
+    {
+      'shed_kw': 1,
+      'start': '2026-01-01T00:00',
+      'end': '2026-01-01T01:00',
+      'group': 'x',
+    },
+    [1, 2],
+  ],
+)
+def test_invalid_shed_targets_are_rejected(scheduler, body):
+  shed, _ = post(scheduler, ('/shed', body))
+
+  assert shed[0] == 400
+  assert len(scheduler) == 0
+
+
+def test_invalid_group_edits_are_rejected(scheduler):
+  edited, groups = post(scheduler, ('/groups/north', {'add': 'ven-1'}))
+
+  assert edited[0] == 400
+  assert groups == (200, {})
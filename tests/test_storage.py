@@ -0,0 +1,240 @@
+from datetime import UTC, datetime, timedelta, timezone
+
+import pytest
+
+from src.storage import create_storage
+from src.storage.log_storage import LogStorage
+
+T0 = datetime(2026, 1, 1, tzinfo=UTC)
+
+
+@pytest.fixture(params=['sqlite', 'memory', 'log'])
+def open_storage(request, tmp_path):
+  """Returns a function that opens the same storage again, closing the last one."""
+  opened = []
+
+  def open_storage():
+    if opened:
+      opened[-1].close()
+    storage = create_storage(request.param, str(tmp_path / 'db' / 'test.db'))
+    storage.create_table()
+    opened.append(storage)
+    return storage
+
+  yield open_storage
+  opened[-1].close()
+
+
+@pytest.fixture
+def storage(open_storage):
+  storage = open_storage()
+  storage.store_many_values(
+    [('ven-1', T0 + timedelta(seconds=second), float(second)) for second in range(10)]
+    + [('ven-2', T0, 100.0)]
+  )
+  return storage
+
+
+def read_pages(storage, **query):
+  rows, cursor = storage.fetch_values_page('ven-1', **query)
+  pages = [rows]
+  while cursor is not None:
+    storage.validate_cursor(cursor, query.get('resolution'))
+    rows, cursor = storage.fetch_values_page('ven-1', cursor=cursor, **query)
+    pages.append(rows)
+  return pages
+
+
+def test_fetch_values_returns_datetime_and_float_rows(storage):
+  rows = storage.fetch_values('ven-1')
+
+  assert rows == [
+    (T0 + timedelta(seconds=second), float(second)) for second in range(10)
+  ]
+  assert all(
+    isinstance(time, datetime) and isinstance(value, float) for time, value in rows
+  )
+
+
+def test_fetch_values_range_is_half_open(storage):
+  rows = storage.fetch_values(
+    'ven-1', T0 + timedelta(seconds=2), T0 + timedelta(seconds=5)
+  )
+
+  assert [value for _, value in rows] == [2.0, 3.0, 4.0]
+  assert storage.fetch_values('unknown') == []
+
+
+def test_fetch_values_page_pages_through_all_rows(storage):
+  pages = read_pages(storage, limit=3)
+
+  assert [len(rows) for rows in pages] == [3, 3, 3, 1]
+  assert [row for rows in pages for row in rows] == storage.fetch_values('ven-1')
+
+
+def test_fetch_values_page_respects_the_range(storage):
+  pages = read_pages(
+    storage, start=T0 + timedelta(seconds=1), end=T0 + timedelta(seconds=8), limit=4
+  )
+
+  assert [value for rows in pages for _, value in rows] == [
+    float(v) for v in range(1, 8)
+  ]
+
+
+def test_fetch_values_page_averages_buckets(storage):
+  pages = read_pages(storage, resolution=5, limit=1)
+
+  assert [row for rows in pages for row in rows] == [
+    (T0, 2.0),
+    (T0 + timedelta(seconds=5), 7.0),
+  ]
+
+
+@pytest.mark.parametrize('resolution', [None, 5])
+@pytest.mark.parametrize('cursor', ['garbage', -1, True, {'time': 0}, [None]])
+def test_validate_cursor_rejects_malformed_cursors(storage, cursor, resolution):
+  with pytest.raises(ValueError):
+    storage.validate_cursor(cursor, resolution)
+
+
+def test_validate_cursor_accepts_no_cursor(storage):
+  storage.validate_cursor(None)
+  storage.validate_cursor(None, 5)
+
+
+def test_values_survive_reopen(open_storage):
+  storage = open_storage()
+  storage.store_many_values(
+    [('ven-1', T0 + timedelta(seconds=s), float(s)) for s in (2, 0, 1)]
+  )
+
+  storage = open_storage()
+
+  assert [value for _, value in storage.fetch_values('ven-1')] == [0.0, 1.0, 2.0]
+
+
+def test_streams_survive_reopen(open_storage):
+  storage = open_storage()
+  storage.save_stream(0, 'ven-1', 'meter', 'voltage', 'V', None, 10.0, 60.0)
+  storage.save_stream(1, 'ven-1', 'meter', 'power', 'W', 'k', None)
+  storage.save_stream(0, 'ven-1', 'meter', 'voltage', 'V', None, 20.0, 60.0)
+
+  storage = open_storage()
+
+  assert [tuple(row) for row in storage.fetch_streams()] == [
+    (0, 'ven-1', 'meter', 'voltage', 'V', None, 20.0, 60.0),
+    (1, 'ven-1', 'meter', 'power', 'W', 'k', None, None),
+  ]
+
+
+def test_report_bindings_survive_reopen(open_storage):
+  storage = open_storage()
+  storage.save_report_binding('request-1', 'r-1', 0)
+  storage.save_report_binding('request-1', 'r-2', 1)
+  storage.save_report_binding('request-1', 'r-1', 2)
+
+  storage = open_storage()
+
+  assert sorted(storage.fetch_report_bindings()) == [
+    ('request-1', 'r-1', 2),
+    ('request-1', 'r-2', 1),
+  ]
+
+
+def test_report_binding_replaces_the_streams_earlier_bindings(open_storage):
+  storage = open_storage()
+  storage.save_report_binding('request-1', 'r-1', 0)
+  storage.save_report_binding('request-1', 'r-2', 1)
+  storage.save_report_binding('request-2', 'r-1', 0)
+
+  assert sorted(storage.fetch_report_bindings()) == [
+    ('request-1', 'r-2', 1),
+    ('request-2', 'r-1', 0),
+  ]
+  storage = open_storage()
+  assert sorted(storage.fetch_report_bindings()) == [
+    ('request-1', 'r-2', 1),
+    ('request-2', 'r-1', 0),
+  ]
+
+
+def test_log_storage_is_shared_per_path(tmp_path):
+  writer = create_storage('log', str(tmp_path / 'test.db'))
+  writer.store_values('ven-1', T0, 1.0)
+
+  reader = create_storage('log', str(tmp_path / '.' / 'test.db'))
+
+  assert reader is writer
+  assert reader.fetch_values('ven-1') == [(T0, 1.0)]
+  writer.close()
+  reopened = create_storage('log', str(tmp_path / 'test.db'))
+  assert reopened is not writer
+  reopened.close()
+
+
+def test_store_many_values_accepts_a_generator(storage):
+  storage.store_many_values(('ven-3', T0 + timedelta(seconds=s), 1.0) for s in range(3))
+
+  assert len(storage.fetch_values('ven-3')) == 3
+
+
+def test_log_storage_truncates_partial_records(tmp_path):
+  path = str(tmp_path / 'test.db')
+  storage = create_storage('log', path)
+  storage.insert_ven('ven', 'ven-1', 'registration-1')
+  storage.store_values('ven-1', T0, 1.0)
+  storage.close()
+  with open(f'{path}.values.log', 'ab') as values_file:
+    values_file.write(b'ven-1\t2026-01-01T00:00:01+00:')
+  with open(f'{path}.vens.log', 'a', encoding='utf-8') as vens_file:
+    vens_file.write('{"name": "other", "ven_')
+
+  storage = create_storage('log', path)
+  storage.store_values('ven-1', T0 + timedelta(seconds=2), 2.0)
+
+  assert storage.fetch_values('ven-1') == [(T0, 1.0), (T0 + timedelta(seconds=2), 2.0)]
+  assert storage.fetch_vens() == [(1, 'ven', 'ven-1', 'registration-1')]
+  storage.close()
+
+
+def test_log_storage_is_locked_to_one_writer(tmp_path):
+  storage = create_storage('log', str(tmp_path / 'test.db'))
+
+  with pytest.raises(RuntimeError):
+    LogStorage(str(tmp_path / 'test.db'))
+  storage.close()
+
+
+def test_times_in_other_zones_are_ordered_and_ranged_in_utc(open_storage):
+  storage = open_storage()
+  zone = timezone(timedelta(hours=2))
+  storage.store_many_values(
+    [
+      ('ven-1', (T0 + timedelta(hours=1)).astimezone(zone), 2.0),
+      ('ven-1', T0, 0.0),
+      ('ven-1', T0 + timedelta(minutes=30), 1.0),
+    ]
+  )
+
+  rows = storage.fetch_values(
+    'ven-1', start=T0.astimezone(zone), end=T0 + timedelta(hours=1)
+  )
+
+  assert [value for _, value in rows] == [0.0, 1.0]
+  assert [value for _, value in storage.fetch_values('ven-1')] == [0.0, 1.0, 2.0]
+
+
+def test_bucket_pages_skip_gaps(storage):
+  storage.store_many_values(
+    [('ven-1', T0 + timedelta(seconds=1000 + second), 1.0) for second in range(3)]
+  )
+
+  pages = read_pages(storage, resolution=5, limit=2)
+
+  assert all(pages)
+  assert [time for rows in pages for time, _ in rows] == [
+    T0,
+    T0 + timedelta(seconds=5),
+    T0 + timedelta(seconds=1000),
+  ]
@@ -0,0 +1,56 @@
+from datetime import timedelta
+
+from src.server.stream_registry import StreamRegistry
+from src.storage import create_storage
+
+
+def handler(stream_id, data):
+  return stream_id, data
+
+
+def test_streams_and_bindings_survive_a_restart(tmp_path):
+  storage = create_storage('sqlite', str(tmp_path / 'test.db'))
+  storage.create_table()
+  registry = StreamRegistry(storage, handler)
+  voltage = registry.register(
+    'ven-1', 'meter', 'voltage', 'V', None, timedelta(seconds=10), timedelta(minutes=1)
+  )
+  power = registry.register('ven-1', 'meter', 'power')
+  registry.bindings()[('request-1', 'r-1')] = registry.callback(power)
+
+  restarted = StreamRegistry(storage, handler)
+
+  assert restarted.load() == 2
+  assert restarted.stream_id('ven-1', 'meter', 'voltage') == voltage
+  assert restarted.sampling_interval(voltage) == timedelta(seconds=10)
+  assert restarted.max_sampling_interval(voltage) == timedelta(minutes=1)
+  assert restarted.max_sampling_interval(power) is None
+  assert restarted.route('request-1', 'r-1') == power
+  assert restarted.route('request-1', 'r-2') is None
+  assert restarted.callback(power)(['data']) == (power, ['data'])
+  storage.close()
+
+
+def test_report_bindings_drop_other_callbacks():
+  registry = StreamRegistry(create_storage('memory', 'test-report-bindings'), handler)
+  bindings = registry.bindings()
+
+  bindings[('request-1', 'r-1')] = handler
+
+  assert len(bindings) == 0
+  assert registry.route('request-1', 'r-1') is None
+
+
+def test_binding_replaces_the_earlier_binding_of_a_stream(tmp_path):
+  storage = create_storage('sqlite', str(tmp_path / 'test.db'))
+  storage.create_table()
+  registry = StreamRegistry(storage, handler)
+  stream_id = registry.register('ven-1', 'meter', 'voltage')
+
+  for request in range(5):
+    registry.bindings()[(f'request-{request}', 'r-1')] = registry.callback(stream_id)
+
+  assert registry.route('request-3', 'r-1') is None
+  assert registry.route('request-4', 'r-1') == stream_id
+  assert storage.fetch_report_bindings() == [('request-4', 'r-1', stream_id)]
+  storage.close()